@@ -0,0 +1,226 @@
+"""Bulk-load a synthetic social graph into the database configured in .env (or --dsn) through asyncpg COPY.
+
+Follower counts follow a power law: a few users are followed by many, most by few. Every generated
+user has the password given by --password; its bcrypt hash is computed once and reused for all rows.
+
+Usage: python -m benchmarks.generate_data --users 1000000 --posts-per-user 5 --follows-per-user 20 \
+           --chats-per-user 2 --messages-per-chat 30 [--timeline]
+"""
+import argparse
+import asyncio
+import bisect
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+
+import asyncpg
+from passlib.hash import bcrypt
+
+from src.settings import settings
+
+BATCH_SIZE = 50000
+CITIES = ['Moscow', 'Saint Petersburg', 'Kazan', 'Novosibirsk', 'Yekaterinburg', 'Samara', 'Omsk', 'Sochi']
+WORDS = ['hello', 'social', 'network', 'fastapi', 'python', 'today', 'weekend', 'photo', 'friends', 'coffee',
+         'travel', 'music', 'work', 'city', 'morning', 'evening', 'news', 'great', 'new', 'post']
+
+
+def batches(records, size: int = BATCH_SIZE):
+    records = iter(records)
+    while batch := list(itertools.islice(records, size)):
+        yield batch
+
+
+def random_text(words: int) -> str:
+    return ' '.join(random.choices(WORDS, k=words))
+
+
+def random_created(days: int) -> datetime:
+    return datetime.now() - timedelta(seconds=random.randint(0, days * 86400))
+
+
+class PowerLawPicker:
+    def __init__(self, first_id: int, count: int, alpha: float):
+        self.first_id = first_id
+        self.order = list(range(first_id, first_id + count))
+        random.shuffle(self.order)
+        self.cum_weights = list(itertools.accumulate(1 / (rank ** alpha) for rank in range(1, count + 1)))
+
+    def pick(self) -> int:
+        index = bisect.bisect(self.cum_weights, random.random() * self.cum_weights[-1])
+        return self.order[min(index, len(self.order) - 1)]
+
+
+async def next_id(connection: asyncpg.Connection, table: str) -> int:
+    return await connection.fetchval(f'SELECT COALESCE(MAX(id), 0) + 1 FROM "{table}"')
+
+
+async def copy(connection: asyncpg.Connection, table: str, columns: list, records) -> int:
+    count = 0
+    for batch in batches(records):
+        await connection.copy_records_to_table(table, records=batch, columns=columns)
+        count += len(batch)
+    await connection.execute(f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+                             f'(SELECT COALESCE(MAX(id), 1) FROM "{table}"))')
+    print(f'{table:10} {count:>12} rows')
+    return count
+
+
+def user_records(first_id: int, count: int, password: str, prefix: str):
+    now = datetime.now()
+    for user_id in range(first_id, first_id + count):
+        username = f'{prefix}{user_id}'
+        yield (user_id, f'{username}@example.com', username, password, f'First{user_id}', f'Last{user_id}',
+               True, False, random_created(365), now, None, False)
+
+
+def profile_records(first_id: int, first_user_id: int, count: int):
+    now = datetime.now()
+    for offset in range(count):
+        yield (first_id + offset, first_user_id + offset, random.choice(CITIES), random.choice(CITIES), now)
+
+
+def post_records(first_id: int, first_user_id: int, users: int, posts_per_user: float, days: int):
+    post_id = first_id
+    for user_id in range(first_user_id, first_user_id + users):
+        for _ in range(int(random.expovariate(1 / posts_per_user)) if posts_per_user else 0):
+            created = random_created(days)
+            yield (post_id, random_text(random.randint(3, 30)), user_id, created, created)
+            post_id += 1
+
+
+def friend_records(first_id: int, first_user_id: int, users: int, follows_per_user: float, alpha: float,
+                   mutual: float):
+    picker = PowerLawPicker(first_user_id, users, alpha)
+    pairs = set()
+    friend_id = first_id
+    for follower_id in range(first_user_id, first_user_id + users):
+        for _ in range(int(random.expovariate(1 / follows_per_user)) if follows_per_user else 0):
+            following_id = picker.pick()
+            pair = (min(follower_id, following_id), max(follower_id, following_id))
+            if following_id == follower_id or pair in pairs:
+                continue
+            pairs.add(pair)
+            yield (friend_id, follower_id, following_id, random.random() < mutual)
+            friend_id += 1
+
+
+def chat_records(first_id: int, first_user_id: int, users: int, chats_per_user: float):
+    pairs = set()
+    chat_id = first_id
+    for user_id in range(first_user_id, first_user_id + users):
+        for _ in range(int(random.expovariate(1 / chats_per_user)) if chats_per_user else 0):
+            companion_id = random.randint(first_user_id, first_user_id + users - 1)
+            pair = (min(user_id, companion_id), max(user_id, companion_id))
+            if companion_id == user_id or pair in pairs:
+                continue
+            pairs.add(pair)
+            yield (chat_id, user_id, companion_id)
+            chat_id += 1
+
+
+def message_records(first_id: int, chats: list, messages_per_chat: float, days: int):
+    message_id = first_id
+    for chat_id, user_1_id, user_2_id in chats:
+        count = int(random.paretovariate(2) * messages_per_chat / 2)
+        created = random_created(days)
+        for _ in range(count):
+            sender_id, recipient_id = (user_1_id, user_2_id) if random.random() < 0.5 else (user_2_id, user_1_id)
+            created += timedelta(seconds=random.randint(1, 3600))
+            yield (message_id, sender_id, recipient_id, chat_id, random_text(random.randint(1, 12))[:150], created)
+            message_id += 1
+
+
+async def fill_chat_state(connection: asyncpg.Connection, first_chat_id: int):
+    await connection.execute('''
+        UPDATE chat SET last_message_id = last.id, last_message_preview = last.message,
+                        last_message_at = last.created, last_sender_id = last.sender_id
+        FROM (
+            SELECT DISTINCT ON (chat_id) chat_id, id, message, created, sender_id FROM messages
+            WHERE chat_id >= $1 ORDER BY chat_id, created DESC, id DESC
+        ) last
+        WHERE chat.id = last.chat_id
+    ''', first_chat_id)
+
+
+async def fill_timeline(connection: asyncpg.Connection, first_post_id: int):
+    await connection.execute('''
+        UPDATE "user" SET fanout_on_read = TRUE
+        WHERE id IN (SELECT following_user_id FROM friend GROUP BY following_user_id HAVING COUNT(*) > $1)
+    ''', settings.feed['fanout_limit'])
+    await connection.execute('''
+        INSERT INTO timeline (user_id, post_id, created)
+        SELECT audience.user_id, posts.id, posts.created
+        FROM posts
+        JOIN "user" author ON author.id = posts.user_id
+        JOIN LATERAL (
+            SELECT follower_user_id AS user_id FROM friend
+            WHERE following_user_id = posts.user_id AND NOT author.fanout_on_read
+            UNION SELECT following_user_id FROM friend
+            WHERE follower_user_id = posts.user_id AND friends AND NOT author.fanout_on_read
+            UNION SELECT posts.user_id
+        ) AS audience ON TRUE
+        WHERE posts.id >= $1
+        ON CONFLICT DO NOTHING
+    ''', first_post_id)
+    print('timeline   filled')
+
+
+async def generate(args):
+    random.seed(args.seed)
+    dsn = args.dsn or settings.database['DATABASE_URL'].replace('postgresql+asyncpg://', 'postgresql://')
+    connection = await asyncpg.connect(dsn)
+    start = time.perf_counter()
+    try:
+        password = bcrypt.hash(args.password)
+        first_user_id = await next_id(connection, 'user')
+        await copy(connection, 'user',
+                   ['id', 'email', 'username', 'password', 'first_name', 'last_name', 'active', 'is_administrator',
+                    'created', 'updated', 'last_entrance', 'fanout_on_read'],
+                   user_records(first_user_id, args.users, password, args.prefix))
+        await copy(connection, 'profile', ['id', 'user_id', 'city_of_birth', 'city_of_residence', 'updated'],
+                   profile_records(await next_id(connection, 'profile'), first_user_id, args.users))
+        first_post_id = await next_id(connection, 'posts')
+        await copy(connection, 'posts', ['id', 'text', 'user_id', 'created', 'updated'],
+                   post_records(first_post_id, first_user_id, args.users, args.posts_per_user, args.days))
+        await copy(connection, 'friend', ['id', 'follower_user_id', 'following_user_id', 'friends'],
+                   friend_records(await next_id(connection, 'friend'), first_user_id, args.users,
+                                  args.follows_per_user, args.alpha, args.mutual))
+        chats = list(chat_records(await next_id(connection, 'chat'), first_user_id, args.users, args.chats_per_user))
+        await copy(connection, 'chat', ['id', 'user_chat_1_id', 'user_chat_2_id'], chats)
+        await copy(connection, 'messages', ['id', 'sender_id', 'recipient_id', 'chat_id', 'message', 'created'],
+                   message_records(await next_id(connection, 'messages'), chats, args.messages_per_chat, args.days))
+        if chats:
+            await fill_chat_state(connection, chats[0][0])
+        if args.timeline:
+            await fill_timeline(connection, first_post_id)
+        await connection.execute('ANALYZE')
+    finally:
+        await connection.close()
+    print(f'done in {time.perf_counter() - start:.1f} s')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--posts-per-user', type=float, default=5)
+    parser.add_argument('--follows-per-user', type=float, default=20)
+    parser.add_argument('--alpha', type=float, default=1.1, help='power-law exponent of follower counts')
+    parser.add_argument('--mutual', type=float, default=0.3, help='share of follow edges that are friendships')
+    parser.add_argument('--chats-per-user', type=float, default=2)
+    parser.add_argument('--messages-per-chat', type=float, default=30)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--prefix', default='gen_')
+    parser.add_argument('--password', default='Generated-password-1')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--timeline', action='store_true', help='materialize home timelines for the new posts')
+    parser.add_argument('--dsn', default=None, help='asyncpg DSN, defaults to the database configured in .env')
+    return parser
+
+
+def main():
+    asyncio.run(generate(build_parser().parse_args()))
+
+
+if __name__ == '__main__':
+    main()
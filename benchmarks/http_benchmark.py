@@ -0,0 +1,156 @@
+"""Drive src.main:app in-process through httpx's ASGI transport and report per-endpoint latency.
+
+Runs against the database configured in .env. Two benchmark users are created on every run.
+Rate limits are switched off unless --rate-limits is given: every request comes from the same client address,
+so the timed sign-in and create-post runs would otherwise measure 429 responses.
+
+Usage: python -m benchmarks.http_benchmark [--requests 200] [--concurrency 10] [--rate-limits]
+                                          [--output results.json]
+"""
+import argparse
+import asyncio
+import io
+import json
+import random
+import subprocess
+import time
+import uuid
+
+import httpx
+from PIL import Image
+
+from src.main import app
+from src.settings import settings
+
+PASSWORD = 'Benchmark-password-1'
+
+
+def percentile(values: list, percent: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+def make_image() -> bytes:
+    image = Image.new('RGB', (800, 600), tuple(random.randint(0, 255) for _ in range(3)))
+    content = io.BytesIO()
+    image.save(content, 'PNG')
+    return content.getvalue()
+
+
+async def sign_up(client: httpx.AsyncClient, username: str):
+    response = await client.post('/user/sign-up', json={'email': f'{username}@example.com', 'username': username,
+                                                        'password': PASSWORD, 'first_name': username,
+                                                        'last_name': username})
+    response.raise_for_status()
+
+
+async def sign_in(client: httpx.AsyncClient, username: str) -> dict:
+    response = await client.post('/user/sign-in', data={'username': username, 'password': PASSWORD})
+    response.raise_for_status()
+    return {'Authorization': f"Bearer {response.json()['access_token']}"}
+
+
+async def prepare(client: httpx.AsyncClient) -> dict:
+    suffix = uuid.uuid4().hex[:8]
+    owner, companion = f'bench_{suffix}_a', f'bench_{suffix}_b'
+    await sign_up(client, owner)
+    await sign_up(client, companion)
+    owner_headers = await sign_in(client, owner)
+    companion_headers = await sign_in(client, companion)
+
+    companion_profile = await client.get('/profile/self', headers=companion_headers)
+    companion_id = companion_profile.json()['data']['profile']['user_id']
+    owner_profile = await client.get('/profile/self', headers=owner_headers)
+    owner_id = owner_profile.json()['data']['profile']['user_id']
+    await client.post('/profile/friend/addition-deletion', params={'user_id': companion_id}, headers=owner_headers)
+    await client.post('/profile/friend/addition-deletion', params={'user_id': owner_id}, headers=companion_headers)
+    for number in range(20):
+        await client.post('/chat/send', params={'user_id': companion_id, 'message': f'message {number}'},
+                          headers=owner_headers)
+    return {'owner': owner, 'companion': companion, 'headers': owner_headers}
+
+
+def endpoints(context: dict) -> dict:
+    headers = context['headers']
+    return {
+        'sign-in': lambda client: client.post('/user/sign-in',
+                                              data={'username': context['owner'], 'password': PASSWORD}),
+        'page-posts': lambda client: client.get('/page/posts', headers=headers),
+        'profile-all': lambda client: client.get('/profile/all', headers=headers),
+        'profile-friends-friends': lambda client: client.get('/profile/friends/friends', headers=headers),
+        'profile-friends-followers': lambda client: client.get('/profile/friends/followers', headers=headers),
+        'profile-friends-followings': lambda client: client.get('/profile/friends/followings', headers=headers),
+        'page-create-post': lambda client: client.post('/page/create-post', headers=headers,
+                                                       data={'text': 'benchmark post'},
+                                                       files={'image': ('post.png', make_image(), 'image/png')}),
+        'chat-get': lambda client: client.get(f"/chat/get/{context['companion']}", headers=headers),
+    }
+
+
+async def measure(client: httpx.AsyncClient, request, requests: int, concurrency: int) -> dict:
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await request(client)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[send() for _ in range(requests)])
+    elapsed = time.perf_counter() - start
+    return {'requests': requests,
+            'errors': errors,
+            'rps': requests / elapsed,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000}
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(requests: int, concurrency: int, only: list) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+        context = await prepare(client)
+        results = {}
+        for name, request in endpoints(context).items():
+            if only and name not in only:
+                continue
+            await measure(client, request, min(requests, concurrency), concurrency)
+            results[name] = await measure(client, request, requests, concurrency)
+    return {'commit': current_commit(), 'requests': requests, 'concurrency': concurrency, 'endpoints': results}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--only', nargs='*', default=None)
+    parser.add_argument('--rate-limits', action='store_true')
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+
+    settings.rate_limits['enabled'] = args.rate_limits
+
+    results = asyncio.run(run(args.requests, args.concurrency, args.only))
+    for name, result in results['endpoints'].items():
+        print(f"{name:28} {result['rps']:9.1f} req/s  p50 {result['p50_ms']:8.2f} ms  "
+              f"p95 {result['p95_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  errors {result['errors']}")
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
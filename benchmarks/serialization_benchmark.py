@@ -0,0 +1,66 @@
+"""Compare response serialization of a post listing: the original json path, a validated response_model
+path, and the pre-built dicts the listing routes now hand straight to ORJSONResponse.
+
+Usage: python -m benchmarks.serialization_benchmark [--posts 1000] [--repeat 20]
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+
+from src.schemas.post_schema import PostListResponse
+from src.services.post_service import PostService
+
+
+class PostRow:
+    def __init__(self, id_post: int):
+        self.id = id_post
+        self.text = f'post number {id_post}'
+        self.image_path = f'static/user_posts/user/{id_post}_thumbnail.png'
+        self.image_variants = {'thumbnail': self.image_path, 'full': f'static/user_posts/user/{id_post}_full.png'}
+        self.created = datetime.now()
+        self.user = UserRow()
+
+
+class UserRow:
+    def __init__(self):
+        self.username = 'user'
+
+
+def serialize_before(payload: dict) -> bytes:
+    return json.dumps(jsonable_encoder(payload)).encode()
+
+
+def serialize_response_model(payload: dict) -> bytes:
+    return orjson.dumps(jsonable_encoder(PostListResponse(**payload)))
+
+
+def serialize_after(payload: dict) -> bytes:
+    data = payload['data']
+    return ORJSONResponse({'status': payload['status'],
+                           'data': {'posts': [PostService.build_post(post) for post in data['posts']],
+                                    'next_cursor': data['next_cursor']}}).body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    payload = {'status': 200, 'data': {'posts': [PostRow(i) for i in range(args.posts)], 'next_cursor': None}}
+    results = {}
+    for name, serialize in [('before', serialize_before), ('response_model', serialize_response_model),
+                            ('after', serialize_after)]:
+        seconds = min(timeit.repeat(lambda: serialize(payload), number=1, repeat=args.repeat))
+        results[name] = {'seconds': seconds, 'bytes': len(serialize(payload))}
+    results['speedup'] = results['before']['seconds'] / results['after']['seconds']
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
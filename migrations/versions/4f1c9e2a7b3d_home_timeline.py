@@ -0,0 +1,37 @@
+"""home timeline
+
+Revision ID: 4f1c9e2a7b3d
+Revises: 53a2ab4d65ea
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f1c9e2a7b3d'
+down_revision = '53a2ab4d65ea'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('user', sa.Column('fanout_on_read', sa.Boolean(), server_default='false', nullable=False))
+    op.create_table('timeline',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('created', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'post_id')
+    )
+    op.create_index('ix_timeline_user_id_created_post_id', 'timeline', ['user_id', 'created', 'post_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_timeline_user_id_created_post_id', table_name='timeline')
+    op.drop_table('timeline')
+    op.drop_column('user', 'fanout_on_read')
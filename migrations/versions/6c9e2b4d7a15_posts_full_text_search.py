@@ -0,0 +1,28 @@
+"""posts full text search
+
+Revision ID: 6c9e2b4d7a15
+Revises: 0b7d3f5a8c24
+Create Date: 2026-10-18 15:41:20.663058
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '6c9e2b4d7a15'
+down_revision = '0b7d3f5a8c24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('search_vector', postgresql.TSVECTOR(),
+                                     sa.Computed("to_tsvector('simple', text)", persisted=True), nullable=True))
+    op.create_index('ix_posts_search_vector', 'posts', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_posts_search_vector', table_name='posts')
+    op.drop_column('posts', 'search_vector')
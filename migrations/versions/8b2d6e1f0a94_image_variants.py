@@ -0,0 +1,26 @@
+"""image variants
+
+Revision ID: 8b2d6e1f0a94
+Revises: 4f1c9e2a7b3d
+Create Date: 2026-10-18 11:04:27.551630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2d6e1f0a94'
+down_revision = '4f1c9e2a7b3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('posts', sa.Column('image_variants', sa.JSON(), nullable=True))
+    op.add_column('profile', sa.Column('photography_variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('profile', 'photography_variants')
+    op.drop_column('posts', 'image_variants')
@@ -0,0 +1,49 @@
+"""chat inbox state
+
+Revision ID: 9e4a7c2f1b58
+Revises: 6c9e2b4d7a15
+Create Date: 2026-10-18 16:27:04.318542
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4a7c2f1b58'
+down_revision = '6c9e2b4d7a15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('chat', sa.Column('last_message_id', sa.Integer(), nullable=True))
+    op.add_column('chat', sa.Column('last_message_preview', sa.String(length=150), nullable=True))
+    op.add_column('chat', sa.Column('last_message_at', sa.DateTime(), nullable=True))
+    op.add_column('chat', sa.Column('last_sender_id', sa.Integer(), nullable=True))
+    op.add_column('chat', sa.Column('unread_1', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('chat', sa.Column('unread_2', sa.Integer(), server_default='0', nullable=False))
+    op.execute('''
+        UPDATE chat SET last_message_id = last.id, last_message_preview = left(last.message, 150),
+                        last_message_at = last.created, last_sender_id = last.sender_id
+        FROM (
+            SELECT DISTINCT ON (chat_id) chat_id, id, message, created, sender_id FROM messages
+            ORDER BY chat_id, created DESC, id DESC
+        ) last
+        WHERE chat.id = last.chat_id
+    ''')
+    op.create_index('ix_chat_user_chat_1_id_last_message_at_id', 'chat',
+                    ['user_chat_1_id', 'last_message_at', 'id'], unique=False)
+    op.create_index('ix_chat_user_chat_2_id_last_message_at_id', 'chat',
+                    ['user_chat_2_id', 'last_message_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chat_user_chat_2_id_last_message_at_id', table_name='chat')
+    op.drop_index('ix_chat_user_chat_1_id_last_message_at_id', table_name='chat')
+    op.drop_column('chat', 'unread_2')
+    op.drop_column('chat', 'unread_1')
+    op.drop_column('chat', 'last_sender_id')
+    op.drop_column('chat', 'last_message_at')
+    op.drop_column('chat', 'last_message_preview')
+    op.drop_column('chat', 'last_message_id')
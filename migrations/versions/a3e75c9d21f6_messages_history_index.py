@@ -0,0 +1,24 @@
+"""messages history index
+
+Revision ID: a3e75c9d21f6
+Revises: 8b2d6e1f0a94
+Create Date: 2026-10-18 11:42:09.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e75c9d21f6'
+down_revision = '8b2d6e1f0a94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_messages_chat_id_created_id', 'messages', ['chat_id', 'created', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_chat_id_created_id', table_name='messages')
@@ -0,0 +1,85 @@
+"""hot path indexes
+
+Revision ID: d94b0c7e5f12
+Revises: a3e75c9d21f6
+Create Date: 2026-10-18 12:20:53.870146
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd94b0c7e5f12'
+down_revision = 'a3e75c9d21f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_posts_user_id_created_id', 'posts', ['user_id', 'created', 'id'], unique=False)
+    op.create_index('ix_posts_created_id', 'posts', ['created', 'id'], unique=False)
+    op.create_index('ix_friend_follower_user_id_following_user_id', 'friend',
+                    ['follower_user_id', 'following_user_id'], unique=False)
+    op.create_index('ix_friend_following_user_id_follower_user_id', 'friend',
+                    ['following_user_id', 'follower_user_id'], unique=False)
+    # Concurrent requests could create the same pair twice: merge it into the oldest row.
+    # Rows in both directions mean both users asked, so the merged row becomes a friendship.
+    op.execute('''
+        UPDATE friend SET friends = TRUE
+        FROM (
+            SELECT min(id) AS id FROM friend
+            GROUP BY least(follower_user_id, following_user_id), greatest(follower_user_id, following_user_id)
+            HAVING count(*) > 1 AND (bool_or(friends) OR count(DISTINCT follower_user_id) > 1)
+        ) duplicate
+        WHERE friend.id = duplicate.id
+    ''')
+    op.execute('''
+        DELETE FROM friend USING friend kept
+        WHERE least(friend.follower_user_id, friend.following_user_id)
+              = least(kept.follower_user_id, kept.following_user_id)
+          AND greatest(friend.follower_user_id, friend.following_user_id)
+              = greatest(kept.follower_user_id, kept.following_user_id)
+          AND friend.id > kept.id
+    ''')
+    op.create_index('uq_friend_users', 'friend',
+                    [sa.text('least(follower_user_id, following_user_id)'),
+                     sa.text('greatest(follower_user_id, following_user_id)')], unique=True)
+    op.create_index('ix_chat_user_chat_1_id_user_chat_2_id', 'chat', ['user_chat_1_id', 'user_chat_2_id'],
+                    unique=False)
+    op.create_index('ix_chat_user_chat_2_id_user_chat_1_id', 'chat', ['user_chat_2_id', 'user_chat_1_id'],
+                    unique=False)
+    # Duplicate chats of one pair: move their messages to the oldest chat, then drop the rest.
+    op.execute('''
+        UPDATE messages SET chat_id = duplicate.kept_id
+        FROM (
+            SELECT id, min(id) OVER (PARTITION BY least(user_chat_1_id, user_chat_2_id),
+                                                  greatest(user_chat_1_id, user_chat_2_id)) AS kept_id
+            FROM chat
+        ) duplicate
+        WHERE messages.chat_id = duplicate.id AND duplicate.id <> duplicate.kept_id
+    ''')
+    op.execute('''
+        DELETE FROM chat USING chat kept
+        WHERE least(chat.user_chat_1_id, chat.user_chat_2_id) = least(kept.user_chat_1_id, kept.user_chat_2_id)
+          AND greatest(chat.user_chat_1_id, chat.user_chat_2_id) = greatest(kept.user_chat_1_id, kept.user_chat_2_id)
+          AND chat.id > kept.id
+    ''')
+    op.create_index('uq_chat_users', 'chat',
+                    [sa.text('least(user_chat_1_id, user_chat_2_id)'),
+                     sa.text('greatest(user_chat_1_id, user_chat_2_id)')], unique=True)
+    # update_profile writes every row of a user, so duplicate profiles are identical: keep the oldest.
+    op.execute('DELETE FROM profile USING profile kept WHERE profile.user_id = kept.user_id AND profile.id > kept.id')
+    op.create_unique_constraint('profile_user_id_key', 'profile', ['user_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('profile_user_id_key', 'profile', type_='unique')
+    op.drop_index('uq_chat_users', table_name='chat')
+    op.drop_index('ix_chat_user_chat_2_id_user_chat_1_id', table_name='chat')
+    op.drop_index('ix_chat_user_chat_1_id_user_chat_2_id', table_name='chat')
+    op.drop_index('uq_friend_users', table_name='friend')
+    op.drop_index('ix_friend_following_user_id_follower_user_id', table_name='friend')
+    op.drop_index('ix_friend_follower_user_id_following_user_id', table_name='friend')
+    op.drop_index('ix_posts_created_id', table_name='posts')
+    op.drop_index('ix_posts_user_id_created_id', table_name='posts')
@@ -0,0 +1,35 @@
+"""profile search indexes
+
+Revision ID: e6a1f38b4c70
+Revises: d94b0c7e5f12
+Create Date: 2026-10-18 12:58:16.402733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6a1f38b4c70'
+down_revision = 'd94b0c7e5f12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_user_username_trgm', 'user', ['username'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'})
+    op.create_index('ix_user_first_name_trgm', 'user', ['first_name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'first_name': 'gin_trgm_ops'})
+    op.create_index('ix_user_last_name_trgm', 'user', ['last_name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'last_name': 'gin_trgm_ops'})
+    op.create_index('ix_profile_city_of_residence_trgm', 'profile', ['city_of_residence'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'city_of_residence': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_profile_city_of_residence_trgm', table_name='profile')
+    op.drop_index('ix_user_last_name_trgm', table_name='user')
+    op.drop_index('ix_user_first_name_trgm', table_name='user')
+    op.drop_index('ix_user_username_trgm', table_name='user')
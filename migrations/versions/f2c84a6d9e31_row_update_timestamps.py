@@ -0,0 +1,28 @@
+"""row update timestamps
+
+Revision ID: f2c84a6d9e31
+Revises: e6a1f38b4c70
+Create Date: 2026-10-18 13:47:32.915027
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c84a6d9e31'
+down_revision = 'e6a1f38b4c70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('user', sa.Column('updated', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+    op.add_column('profile', sa.Column('updated', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+    op.add_column('posts', sa.Column('updated', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('posts', 'updated')
+    op.drop_column('profile', 'updated')
+    op.drop_column('user', 'updated')
@@ -1,20 +1,31 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from src.routers.post_router import router as post_router
 from src.routers.user_router import router as user_router
 from src.routers.profile_router import router as profile_router
-from src.routers.message_router import router as message_router
+from src.routers.message_router import router as message_router, manager
+from src.routers.internal_router import router as internal_router
+from src.services.auxiliary_service import ImageExecutorService
+from src.services.message_service import message_writer
+from src.services.metrics_service import MetricsMiddleware
+from src.services.profiler_service import ProfilerMiddleware, register_query_events
+from src.services.storage_service import ImmutableStaticFiles
+from src.services.user_service import PasswordExecutorService
+from src.settings import settings
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
+app.mount("/static/media", ImmutableStaticFiles(directory=settings.media['directory'], check_dir=False), name="media")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 app.include_router(user_router, prefix='/user')
 app.include_router(post_router, prefix='/page')
 app.include_router(profile_router, prefix='/profile')
 app.include_router(message_router, prefix='/chat')
+app.include_router(internal_router, prefix='/internal')
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,3 +34,15 @@ app.add_middleware(
     allow_methods=['*'],
     allow_headers=['*']
 )
+app.add_middleware(MetricsMiddleware)
+if settings.profiler['enabled']:
+    register_query_events()
+    app.add_middleware(ProfilerMiddleware)
+
+
+@app.on_event('shutdown')
+async def shutdown():
+    PasswordExecutorService.shutdown()
+    ImageExecutorService.shutdown()
+    await message_writer.close()
+    await manager.pubsub.close()
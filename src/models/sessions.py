@@ -1,10 +1,54 @@
+import time
 from typing import AsyncGenerator
 
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from src.settings import settings
 
-engine = create_async_engine(settings.database['DATABASE_URL'])
+
+class MeasuredQueuePool(AsyncAdaptedQueuePool):
+    stats: dict = {'waiters': 0, 'checkouts': 0, 'checkout_time': 0.0, 'checkout_time_max': 0.0, 'timeouts': 0}
+
+    def _do_get(self):
+        start = time.perf_counter()
+        self.stats['waiters'] += 1
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.stats['timeouts'] += 1
+            raise
+        finally:
+            self.stats['waiters'] -= 1
+        duration = time.perf_counter() - start
+        self.stats['checkouts'] += 1
+        self.stats['checkout_time'] += duration
+        self.stats['checkout_time_max'] = max(self.stats['checkout_time_max'], duration)
+        return connection
+
+    def get_stats(self) -> dict:
+        checkouts = self.stats['checkouts']
+        return {'size': self.size(),
+                'checked_in': self.checkedin(),
+                'checked_out': self.checkedout(),
+                'overflow': self.overflow(),
+                'waiters': self.stats['waiters'],
+                'checkouts': checkouts,
+                'timeouts': self.stats['timeouts'],
+                'checkout_time_avg': self.stats['checkout_time'] / checkouts if checkouts else 0.0,
+                'checkout_time_max': self.stats['checkout_time_max']}
+
+
+engine = create_async_engine(
+    settings.database['DATABASE_URL'],
+    poolclass=MeasuredQueuePool,
+    pool_size=settings.database['POOL_SIZE'],
+    max_overflow=settings.database['POOL_MAX_OVERFLOW'],
+    pool_timeout=settings.database['POOL_TIMEOUT'],
+    pool_recycle=settings.database['POOL_RECYCLE'],
+    pool_pre_ping=settings.database['POOL_PRE_PING'],
+    connect_args={'prepared_statement_cache_size': settings.database['PREPARED_STATEMENT_CACHE_SIZE']}
+)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
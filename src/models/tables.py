@@ -1,7 +1,9 @@
 from datetime import datetime
 
 from pydantic import EmailStr
-from sqlalchemy import Integer, String, DateTime, Boolean, ForeignKey, Date, or_, and_
+from sqlalchemy import Integer, Float, String, Computed, DateTime, Boolean, ForeignKey, Date, JSON, Index, \
+    UniqueConstraint, func, or_, and_
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -11,6 +13,14 @@ class Base(DeclarativeBase):
 
 class User(Base):
     __tablename__ = 'user'
+    __table_args__ = (
+        Index('ix_user_username_trgm', 'username', postgresql_using='gin',
+              postgresql_ops={'username': 'gin_trgm_ops'}),
+        Index('ix_user_first_name_trgm', 'first_name', postgresql_using='gin',
+              postgresql_ops={'first_name': 'gin_trgm_ops'}),
+        Index('ix_user_last_name_trgm', 'last_name', postgresql_using='gin',
+              postgresql_ops={'last_name': 'gin_trgm_ops'}),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     email: Mapped[EmailStr] = mapped_column(String, nullable=False, unique=True)
     username: Mapped[str] = mapped_column(String(150), nullable=False, unique=True)
@@ -22,15 +32,22 @@ class User(Base):
     active: Mapped[bool] = mapped_column(Boolean, default=False)
     is_administrator: Mapped[bool] = mapped_column(Boolean, default=False)
     created: Mapped[datetime] = mapped_column(DateTime, default=datetime.now())
+    updated: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, onupdate=datetime.now,
+                                              server_default=func.now())
     last_entrance: Mapped[datetime] = mapped_column(DateTime, nullable=True)
     followers: Mapped[list['Friend']] = relationship(back_populates='follower_user',
                                                      foreign_keys='Friend.follower_user_id')
     following: Mapped[list['Friend']] = relationship(back_populates='following_user',
                                                      foreign_keys='Friend.following_user_id')
+    fanout_on_read: Mapped[bool] = mapped_column(Boolean, default=False, server_default='false')
 
 
 class Friend(Base):
     __tablename__ = 'friend'
+    __table_args__ = (
+        Index('ix_friend_follower_user_id_following_user_id', 'follower_user_id', 'following_user_id'),
+        Index('ix_friend_following_user_id_follower_user_id', 'following_user_id', 'follower_user_id'),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     follower_user_id: Mapped[int] = mapped_column(ForeignKey('user.id'), nullable=False)
     follower_user: Mapped['User'] = relationship(back_populates='followers', foreign_keys=[follower_user_id])
@@ -41,41 +58,99 @@ class Friend(Base):
 
 class Profile(Base):
     __tablename__ = 'profile'
+    __table_args__ = (
+        Index('ix_profile_city_of_residence_trgm', 'city_of_residence', postgresql_using='gin',
+              postgresql_ops={'city_of_residence': 'gin_trgm_ops'}),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey('user.id'))
+    user_id: Mapped[int] = mapped_column(ForeignKey('user.id'), unique=True)
     user: Mapped['User'] = relationship(back_populates='profile')
     date_of_birth: Mapped[datetime.date] = mapped_column(Date, nullable=True)
     photography: Mapped[str] = mapped_column(String, nullable=True)
+    photography_variants: Mapped[dict] = mapped_column(JSON, nullable=True)
     city_of_birth: Mapped[str] = mapped_column(String(150), nullable=True)
     city_of_residence: Mapped[str] = mapped_column(String(150), nullable=True)
     family_status: Mapped[str] = mapped_column(String(150), nullable=True)
     additional_information: Mapped[str] = mapped_column(String, nullable=True)
+    updated: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, onupdate=datetime.now,
+                                              server_default=func.now())
 
 
 class Post(Base):
     __tablename__ = 'posts'
+    __table_args__ = (
+        Index('ix_posts_user_id_created_id', 'user_id', 'created', 'id'),
+        Index('ix_posts_created_id', 'created', 'id'),
+        Index('ix_posts_search_vector', 'search_vector', postgresql_using='gin'),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     text: Mapped[str] = mapped_column(String(250), nullable=False)
     user_id: Mapped[str] = mapped_column(ForeignKey('user.id'))
     user: Mapped['User'] = relationship(back_populates='posts')
     image_path: Mapped[str] = mapped_column(String, nullable=True)
-    created: Mapped[datetime] = mapped_column(DateTime, default=datetime.now())
+    image_variants: Mapped[dict] = mapped_column(JSON, nullable=True)
+    created: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    updated: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, onupdate=datetime.now,
+                                              server_default=func.now())
+    search_vector: Mapped[str] = mapped_column(TSVECTOR, Computed("to_tsvector('simple', text)", persisted=True),
+                                               deferred=True)
+
+
+class Timeline(Base):
+    __tablename__ = 'timeline'
+    __table_args__ = (
+        Index('ix_timeline_user_id_created_post_id', 'user_id', 'created', 'post_id'),
+        UniqueConstraint('user_id', 'post_id'),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    post_id: Mapped[int] = mapped_column(ForeignKey('posts.id', ondelete='CASCADE'), nullable=False)
+    created: Mapped[datetime] = mapped_column(DateTime, nullable=False)
 
 
 class Chat(Base):
     __tablename__ = 'chat'
+    __table_args__ = (
+        Index('ix_chat_user_chat_1_id_user_chat_2_id', 'user_chat_1_id', 'user_chat_2_id'),
+        Index('ix_chat_user_chat_2_id_user_chat_1_id', 'user_chat_2_id', 'user_chat_1_id'),
+        Index('ix_chat_user_chat_1_id_last_message_at_id', 'user_chat_1_id', 'last_message_at', 'id'),
+        Index('ix_chat_user_chat_2_id_last_message_at_id', 'user_chat_2_id', 'last_message_at', 'id'),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_chat_1_id: Mapped[int] = mapped_column(Integer, ForeignKey('user.id'))
     user_chat_2_id: Mapped[int] = mapped_column(Integer, ForeignKey('user.id'))
+    last_message_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    last_message_preview: Mapped[str] = mapped_column(String(150), nullable=True)
+    last_message_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    last_sender_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    unread_1: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
+    unread_2: Mapped[int] = mapped_column(Integer, default=0, server_default='0')
     messages: Mapped[list['Messages']] = relationship('Messages', back_populates="chat")
 
 
 class Messages(Base):
     __tablename__ = 'messages'
+    __table_args__ = (
+        Index('ix_messages_chat_id_created_id', 'chat_id', 'created', 'id'),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     sender_id: Mapped[int] = mapped_column(ForeignKey('user.id'), nullable=False)
     recipient_id: Mapped[int] = mapped_column(ForeignKey('user.id'), nullable=False)
     chat_id: Mapped[int] = mapped_column(Integer, ForeignKey('chat.id'))
     chat: Mapped['Chat'] = relationship('Chat', back_populates="messages")
     message: Mapped[str] = mapped_column(String(150), nullable=False)
-    created: Mapped[datetime] = mapped_column(DateTime, default=datetime.now())
+    created: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+
+
+class RateLimit(Base):
+    __tablename__ = 'rate_limit'
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    tokens: Mapped[float] = mapped_column(Float, nullable=False)
+    allowed: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    updated: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+Index('uq_friend_users', func.least(Friend.follower_user_id, Friend.following_user_id),
+      func.greatest(Friend.follower_user_id, Friend.following_user_id), unique=True)
+Index('uq_chat_users', func.least(Chat.user_chat_1_id, Chat.user_chat_2_id),
+      func.greatest(Chat.user_chat_1_id, Chat.user_chat_2_id), unique=True)
@@ -0,0 +1,42 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.models.sessions import engine
+from src.routers.message_router import manager
+from src.services.auxiliary_service import ImageExecutorService
+from src.services.metrics_service import MetricsService
+from src.services.user_service import PasswordExecutorService, AuthCacheService
+
+router = APIRouter(tags=['internal'])
+
+
+@router.get('/pool')
+async def pool_stats():
+    return {'status': 200, 'data': {'pool': engine.pool.get_stats()}}
+
+
+@router.get('/auth-cache')
+async def auth_cache_stats():
+    return {'status': 200, 'data': {'auth_cache': AuthCacheService.get_stats()}}
+
+
+@router.get('/connections')
+async def connections_stats():
+    return {'status': 200, 'data': {'connections': manager.get_stats()}}
+
+
+@router.get('/password-executor')
+async def password_executor_stats():
+    return {'status': 200, 'data': {'password_executor': PasswordExecutorService.get_stats()}}
+
+
+@router.get('/metrics', response_class=PlainTextResponse)
+async def metrics():
+    gauges = [('websocket_connections', {'room': room}, len(connections))
+              for room, connections in manager.chat_users.items()]
+    gauges += [(f'chat_{name}', {}, value) for name, value in manager.get_stats().items()]
+    gauges += [(f'db_pool_{name}', {}, value) for name, value in engine.pool.get_stats().items()]
+    gauges += [(f'auth_cache_{name}', {}, value) for name, value in AuthCacheService.get_stats().items()]
+    gauges += [(f'password_executor_{name}', {}, value) for name, value in PasswordExecutorService.get_stats().items()]
+    gauges += [(f'image_executor_{name}', {}, value) for name, value in ImageExecutorService.get_stats().items()]
+    return PlainTextResponse(MetricsService.render(gauges), media_type='text/plain; version=0.0.4')
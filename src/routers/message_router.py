@@ -1,24 +1,42 @@
-from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
 from fastapi.exceptions import WebSocketException
+from fastapi.responses import ORJSONResponse
 from fastapi.websockets import WebSocket, WebSocketDisconnect
 
+from src.schemas.message_schema import ChatResponse, SentMessageResponse, InboxResponse, ReadResponse
 from src.services.message_service import MessageService, ConnectionManager, \
     MessageAuxiliaryService
-from src.settings import templates
+from src.services.rate_limit_service import RateLimiter
+from src.settings import templates, settings
 
 router = APIRouter(tags=['messages'])
 
 
-@router.post('/send')
+@router.post('/send', response_model=SentMessageResponse, dependencies=[Depends(RateLimiter('chat-send'))])
 async def send_message(user_id: int, message: str,
                        service: MessageService = Depends()):
     return await service.send_message(user_id, message)
 
 
-@router.get('/get/{username}')
+@router.get('/get/{username}', response_model=ChatResponse)
 async def chat(username: str,
+               before: str = None,
+               limit: int = Query(settings.pagination['limit'], ge=1, le=settings.pagination['max_limit']),
                service: MessageService = Depends()):
-    return await service.chat(username)
+    return ORJSONResponse(await service.chat(username, before, limit))
+
+
+@router.get('/inbox', response_model=InboxResponse)
+async def inbox(cursor: str = None,
+                limit: int = Query(settings.pagination['limit'], ge=1, le=settings.pagination['max_limit']),
+                service: MessageService = Depends()):
+    return await service.get_inbox(cursor, limit)
+
+
+@router.post('/read/{username}', response_model=ReadResponse)
+async def mark_read(username: str,
+                    service: MessageService = Depends()):
+    return await service.mark_read(username)
 
 
 @router.get('/with/{username}', )
@@ -48,10 +66,12 @@ async def room_chat_ws(websocket: WebSocket, username: str,
     user = await service.get_user(username, filter_field='username', ws=True)
     chat = await service.get_chat(user.id)
     chat_websocket = f'chat_{chat.id}'
-    await manager.connect(websocket, chat_websocket)
+    await manager.connect(websocket, chat_websocket, service.user_id)
     try:
         while True:
             data = await websocket.receive_text()
             await manager.broadcast(websocket, chat_websocket, user, chat, data, service)
     except WebSocketDisconnect:
-        manager.disconnect(websocket, chat_websocket)
+        pass
+    finally:
+        await manager.disconnect(websocket, chat_websocket)
@@ -1,39 +1,71 @@
-from fastapi import APIRouter, Depends, Form, UploadFile, File
+from fastapi import APIRouter, Depends, Form, UploadFile, File, Query, Request
+from fastapi.responses import ORJSONResponse
 
-from src.schemas.post_schema import SortedPostSchema
+from src.schemas.post_schema import SortedPostSchema, PostListResponse, MyPostListResponse, \
+    PostDetailResponse, PostChangeResponse
+from src.services.auxiliary_service import ETagService
 from src.services.post_service import PostService
+from src.services.rate_limit_service import RateLimiter
+from src.settings import settings
 
 router = APIRouter(tags=['posts'])
 
 
-@router.get('/posts')
-async def get_user_post(user: str = None,
+@router.get('/posts', response_model=PostListResponse)
+async def get_user_post(request: Request,
+                        user: str = None,
                         created: SortedPostSchema = None,
+                        cursor: str = None,
+                        limit: int = Query(settings.pagination['limit'], ge=1, le=settings.pagination['max_limit']),
                         services: PostService = Depends()):
-    posts = await services.get_posts_all(user, created)
-    return {'status': 200, 'data': {'posts': posts}}
+    etag = await services.get_posts_all_etag(user, created, cursor, limit)
+    if ETagService.not_modified(request, etag):
+        return ETagService.not_modified_response(etag)
+    posts = await services.get_posts_all(user, created, cursor, limit)
+    return ORJSONResponse({'status': 200, 'data': {'posts': posts['posts'], 'next_cursor': posts['next_cursor']}},
+                          headers={'ETag': etag})
 
 
-@router.get('/my-posts')
-async def get_user_post(services: PostService = Depends()):
-    posts = await services.get_posts()
-    return {'status': 200, 'data': {'post': posts}}
+@router.get('/feed', response_model=PostListResponse)
+async def get_feed(cursor: str = None,
+                   limit: int = Query(settings.pagination['limit'], ge=1, le=settings.pagination['max_limit']),
+                   services: PostService = Depends()):
+    posts = await services.get_feed(cursor, limit)
+    return ORJSONResponse({'status': 200, 'data': {'posts': posts['posts'], 'next_cursor': posts['next_cursor']}})
 
 
-@router.get('/my-post/{id_post}')
+@router.get('/search', response_model=PostListResponse)
+async def search_posts(q: str = Query(min_length=1, max_length=250),
+                       cursor: str = None,
+                       limit: int = Query(settings.pagination['limit'], ge=1, le=settings.pagination['max_limit']),
+                       services: PostService = Depends()):
+    posts = await services.search_posts(q, cursor, limit)
+    return ORJSONResponse({'status': 200, 'data': {'posts': posts['posts'], 'next_cursor': posts['next_cursor']}})
+
+
+@router.get('/my-posts', response_model=MyPostListResponse)
+async def get_user_post(cursor: str = None,
+                        limit: int = Query(settings.pagination['limit'], ge=1, le=settings.pagination['max_limit']),
+                        services: PostService = Depends()):
+    posts = await services.get_posts(cursor, limit)
+    return {'status': 200, 'data': {'post': posts['posts'], 'next_cursor': posts['next_cursor']}}
+
+
+@router.get('/my-post/{id_post}', response_model=PostDetailResponse)
 async def get_user_post(id_post: int, services: PostService = Depends(PostService)):
     post = await services.get_post(id_post)
     return {'status': 200, 'data': {'posts': post}}
 
 
-@router.post('/create-post')
+@router.post('/create-post', response_model=PostChangeResponse,
+             dependencies=[Depends(RateLimiter('create-post'))])
 async def create_post(text: str = Form(),
                       image: UploadFile = File(None),
                       services: PostService = Depends()):
     return await services.create_post(text, image)
 
 
-@router.put('/update-post/{id_post}')
+@router.put('/update-post/{id_post}', response_model=PostChangeResponse)
 async def update_post(id_post: int,
                       text: str = Form(None),
                       image: UploadFile = File(None),
@@ -41,7 +73,7 @@ async def update_post(id_post: int,
     return await services.update_post(id_post, text, image)
 
 
-@router.delete('/delete-post/{id_post}')
+@router.delete('/delete-post/{id_post}', response_model=PostChangeResponse)
 async def delete_post(id_post: int,
                       services: PostService = Depends()):
     return await services.delete_post(id_post)
@@ -1,41 +1,86 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import ORJSONResponse
 
-from src.schemas.profile_schema import UpdateProfile
+from src.schemas.profile_schema import UpdateProfile, ProfileSearchMatch, ProfileListResponse, ProfileResponse, \
+    ProfileUpdateResponse, FriendActionResponse, FriendCountResponse, FriendListResponse, FriendSuggestionResponse
+from src.services.auxiliary_service import ETagService
 from src.services.profile_service import ProfileService
+from src.services.rate_limit_service import RateLimiter
+from src.settings import settings
 
 router = APIRouter(tags=['profile'])
 
 
-@router.get('/all')
-async def get_profiles(service: ProfileService = Depends()):
-    profiles = await service.get_profiles()
-    return {'status': 200, 'data': {'profiles': profiles}}
+@router.get('/all', response_model=ProfileListResponse)
+async def get_profiles(search: str = Query(None, min_length=3, max_length=150),
+                       match: ProfileSearchMatch = ProfileSearchMatch.prefix,
+                       cursor: str = None,
+                       limit: int = Query(settings.pagination['limit'], ge=1, le=settings.pagination['max_limit']),
+                       service: ProfileService = Depends()):
+    profiles = await service.get_profiles(search, match, cursor, limit)
+    return ORJSONResponse({'status': 200,
+                           'data': {'profiles': profiles['profiles'], 'next_cursor': profiles['next_cursor']}})
 
 
-@router.get('/get/{profile_id}')
-async def get_profile(profile_id: int, service: ProfileService = Depends()):
+@router.get('/get/{profile_id}', response_model=ProfileResponse)
+async def get_profile(request: Request, response: Response, profile_id: int,
+                      service: ProfileService = Depends()):
+    etag = await service.get_profile_etag(profile_id)
+    if ETagService.not_modified(request, etag):
+        return ETagService.not_modified_response(etag)
     profile = await service.get_profile(profile_id)
+    response.headers['ETag'] = etag or await service.get_profile_etag(profile_id)
     return {'status': 200, 'data': {'profile': profile}}
 
 
-@router.get('/self')
-async def profile(service: ProfileService = Depends()):
+@router.get('/self', response_model=ProfileResponse)
+async def profile(request: Request, response: Response, service: ProfileService = Depends()):
+    etag = await service.get_profile_etag(service.user_id)
+    if ETagService.not_modified(request, etag):
+        return ETagService.not_modified_response(etag)
     profile = await service.profile()
+    response.headers['ETag'] = etag or await service.get_profile_etag(service.user_id)
     return {'status': 200, 'data': {'profile': profile}}
 
 
-@router.put('/update')
+@router.put('/update', response_model=ProfileUpdateResponse,
+            dependencies=[Depends(RateLimiter('profile-update'))])
 async def update_profile(service: ProfileService = Depends(),
                          profile: UpdateProfile = Depends(UpdateProfile.as_form)):
     return await service.update_profile(profile)
 
 
-@router.post('/friend/addition-deletion')
+@router.post('/friend/addition-deletion', response_model=FriendActionResponse)
 async def addition_deletion(user_id: int,
                             service: ProfileService = Depends()):
     return await service.addition_and_deletion_friend(user_id)
 
 
-@router.get('/friends/{type}')
-async def get_friend(type: str, service: ProfileService = Depends()):
-    return await service.get_friend(type)
+@router.get('/friend/count', response_model=FriendCountResponse)
+async def get_friend_count(user_id: int = None, service: ProfileService = Depends()):
+    return await service.get_friend_count(user_id)
+
+
+@router.get('/friend/mutual/{user_id}', response_model=FriendListResponse,
+            response_model_exclude_unset=True)
+async def get_mutual_friends(user_id: int,
+                             cursor: str = None,
+                             limit: int = Query(settings.pagination['limit'], ge=1,
+                                                le=settings.pagination['max_limit']),
+                             service: ProfileService = Depends()):
+    return await service.get_mutual_friends(user_id, cursor, limit)
+
+
+@router.get('/friend/suggestions', response_model=FriendSuggestionResponse)
+async def get_friend_suggestions(limit: int = Query(settings.pagination['limit'], ge=1,
+                                                    le=settings.pagination['max_limit']),
+                                 service: ProfileService = Depends()):
+    return await service.get_friend_suggestions(limit)
+
+
+@router.get('/friends/{type}', response_model=FriendListResponse, response_model_exclude_unset=True)
+async def get_friend(type: str,
+                     cursor: str = None,
+                     limit: int = Query(settings.pagination['limit'], ge=1, le=settings.pagination['max_limit']),
+                     service: ProfileService = Depends()):
+    return await service.get_friend(type, cursor, limit)
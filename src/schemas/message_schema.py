@@ -0,0 +1,55 @@
+import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ChatMessageSchema(BaseModel):
+    type: str
+    message: str
+    created: datetime.datetime
+
+
+class ChatResponse(BaseModel):
+    messages: dict[str, list[ChatMessageSchema]]
+    before: Optional[str] = None
+
+
+class SentMessageData(BaseModel):
+    username: str
+    message: str
+
+
+class SentMessageResponse(BaseModel):
+    status: int
+    data: SentMessageData
+
+
+class InboxChatSchema(BaseModel):
+    chat_id: int
+    username: str
+    unread: int
+    last_message_id: Optional[int] = None
+    last_message: Optional[str] = None
+    last_message_at: Optional[datetime.datetime] = None
+    last_message_outgoing: bool
+
+
+class InboxData(BaseModel):
+    chats: list[InboxChatSchema]
+    next_cursor: Optional[str] = None
+
+
+class InboxResponse(BaseModel):
+    status: int
+    data: InboxData
+
+
+class ReadData(BaseModel):
+    username: str
+    unread: int
+
+
+class ReadResponse(BaseModel):
+    status: int
+    data: ReadData
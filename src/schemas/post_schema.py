@@ -8,9 +8,63 @@ from pydantic import BaseModel
 class PostSchema(BaseModel):
     id: int
     image_path: Optional[str] = None
+    image_variants: Optional[dict] = None
     text: str
     created: datetime.datetime
 
+    class Config:
+        orm_mode = True
+
+
+class PostUserSchema(BaseModel):
+    username: str
+
+    class Config:
+        orm_mode = True
+
+
+class PostWithUserSchema(PostSchema):
+    user: Optional[PostUserSchema] = None
+
+
+class PostListData(BaseModel):
+    posts: list[PostWithUserSchema]
+    next_cursor: Optional[str] = None
+
+
+class PostListResponse(BaseModel):
+    status: int
+    data: PostListData
+
+
+class MyPostListData(BaseModel):
+    post: list[PostSchema]
+    next_cursor: Optional[str] = None
+
+
+class MyPostListResponse(BaseModel):
+    status: int
+    data: MyPostListData
+
+
+class PostDetailData(BaseModel):
+    posts: PostSchema
+
+
+class PostDetailResponse(BaseModel):
+    status: int
+    data: PostDetailData
+
+
+class PostChangeData(BaseModel):
+    message: str
+    post: PostSchema
+
+
+class PostChangeResponse(BaseModel):
+    status: int
+    data: PostChangeData
+
 
 class SortedPostSchema(str, Enum):
     descending = 'descending'
@@ -13,6 +13,104 @@ class FamilyStatus(str, Enum):
     married = 'married'
 
 
+class ProfileSearchMatch(str, Enum):
+    prefix = 'prefix'
+    substring = 'substring'
+
+
+class ProfileSchema(BaseModel):
+    user_id: int
+    profile_id: int
+    username: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    date_of_birth: Optional[date] = None
+    city_of_birth: Optional[str] = None
+    city_of_residence: Optional[str] = None
+    family_status: Optional[str] = None
+    photography: Optional[str] = None
+    photography_variants: Optional[dict] = None
+    additional_information: Optional[str] = None
+
+
+class ProfileListData(BaseModel):
+    profiles: list[ProfileSchema]
+    next_cursor: Optional[str] = None
+
+
+class ProfileListResponse(BaseModel):
+    status: int
+    data: ProfileListData
+
+
+class ProfileData(BaseModel):
+    profile: ProfileSchema
+
+
+class ProfileResponse(BaseModel):
+    status: int
+    data: ProfileData
+
+
+class ProfileUpdateData(BaseModel):
+    message: str
+    post: ProfileSchema
+
+
+class ProfileUpdateResponse(BaseModel):
+    status: int
+    data: ProfileUpdateData
+
+
+class FriendUserSchema(BaseModel):
+    id: int
+    username: str
+
+
+class FriendSuggestionSchema(FriendUserSchema):
+    mutual: int
+
+
+class FriendListData(BaseModel):
+    friends: Optional[list[FriendUserSchema]] = None
+    followers: Optional[list[FriendUserSchema]] = None
+    next_cursor: Optional[str] = None
+
+
+class FriendListResponse(BaseModel):
+    status: int
+    data: FriendListData
+
+
+class FriendCountData(BaseModel):
+    friends: int
+    followers: int
+    followings: int
+
+
+class FriendCountResponse(BaseModel):
+    status: int
+    data: FriendCountData
+
+
+class FriendSuggestionData(BaseModel):
+    suggestions: list[FriendSuggestionSchema]
+
+
+class FriendSuggestionResponse(BaseModel):
+    status: int
+    data: FriendSuggestionData
+
+
+class FriendActionData(BaseModel):
+    message: str
+
+
+class FriendActionResponse(BaseModel):
+    status: int
+    data: FriendActionData
+
+
 class UpdateProfile(BaseModel):
     first_name: str = Field(min_length=3)
     last_name: str = Field(min_length=3)
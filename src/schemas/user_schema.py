@@ -24,6 +24,15 @@ class CreateUserSchema(BaseModel):
     #     return password
 
 
+class SignUpData(BaseModel):
+    messages: list[str]
+
+
+class SignUpResponse(BaseModel):
+    status: int
+    data: SignUpData
+
+
 class TokenUserSchema(BaseModel):
     id: int
     email: EmailStr
@@ -1,37 +1,177 @@
+import base64
+import hashlib
 import io
-import os
+import json
+from datetime import datetime
 from typing import AsyncGenerator
 
 from PIL import Image
-from fastapi import UploadFile, Depends
+from fastapi import UploadFile, Depends, HTTPException, Request, Response
 
 from src.models.sessions import get_async_session
 from src.routers.user_router import sign_in_user
 from src.schemas.user_schema import JWTToken
+from src.services.executor_service import ExecutorService
+from src.services.storage_service import storage
 from src.services.user_service import UserService
+from src.settings import settings
+
+
+def process_image(content: bytes, variants: dict, webp: bool, max_pixels: int) -> dict:
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    image = Image.open(io.BytesIO(content))
+    image_format = image.format
+    image.load()
+    images = {}
+    for variant, max_size in variants.items():
+        variant_image = image.copy()
+        variant_image.thumbnail(max_size)
+        images[variant] = io.BytesIO()
+        variant_image.save(images[variant], image_format)
+        if webp:
+            images[f'{variant}_webp'] = io.BytesIO()
+            variant_image.save(images[f'{variant}_webp'], 'WEBP')
+    return {variant: data.getvalue() for variant, data in images.items()}
+
+
+class ImageExecutorService(ExecutorService):
+    executor = None
+    semaphore = None
+    stats = {'queued': 0, 'running': 0}
+
+    @classmethod
+    def get_config(cls) -> dict:
+        return {'executor': settings.images['executor'],
+                'workers': settings.images['workers'],
+                'concurrency': settings.images['concurrency']}
 
 
 class UploadFileService:
+    image_extensions: dict = {'image/jpeg': 'jpg', 'image/png': 'png'}
+
+    image_formats: dict = {'image/jpeg': 'JPEG', 'image/png': 'PNG'}
+
+    @classmethod
+    async def read_image(cls, uploaded_file: UploadFile) -> bytes:
+        max_bytes = settings.images['max_bytes']
+        too_large = HTTPException(status_code=413, detail={'status': 413, 'data': {
+            'errors': [f'File must not be larger than {max_bytes} bytes']}})
+        if uploaded_file.size is not None and uploaded_file.size > max_bytes:
+            raise too_large
+        content = bytearray()
+        while chunk := await uploaded_file.read(settings.images['chunk_size']):
+            content.extend(chunk)
+            if len(content) > max_bytes:
+                raise too_large
+        return bytes(content)
+
+    @classmethod
+    def check_image_header(cls, content: bytes, content_type: str):
+        invalid_image = HTTPException(status_code=400, detail={'status': 400, 'data': {
+            'errors': ['File must be an image']}})
+        try:
+            with Image.open(io.BytesIO(content)) as image:
+                image_format, (width, height) = image.format, image.size
+        except (Image.DecompressionBombError, OSError, ValueError):
+            raise invalid_image
+        if image_format != cls.image_formats[content_type]:
+            raise invalid_image
+        if max(width, height) > settings.images['max_dimension'] or width * height > settings.images['max_pixels']:
+            raise HTTPException(status_code=413, detail={'status': 413, 'data': {
+                'errors': ['Image dimensions are too large']}})
+
     @classmethod
-    async def check_image(cls, uploaded_file: UploadFile, max_size: tuple = None) -> bytes:
-        if not uploaded_file.content_type in ['image/jpeg', 'image/png', 'image/svg']:
+    async def check_image(cls, uploaded_file: UploadFile) -> bytes:
+        if not uploaded_file.content_type in cls.image_extensions:
             raise HTTPException(status_code=400, detail={'status': 400, 'data': {'errors': ['File must be an image']}})
+        content = await cls.read_image(uploaded_file)
+        cls.check_image_header(content, uploaded_file.content_type)
+        return content
+
+    @classmethod
+    def image_keys(cls, digest: str, dir1: str, extension: str) -> dict:
+        keys = {}
+        for variant in settings.images['variants'][dir1]:
+            keys[variant] = f'{dir1}/{digest[:2]}/{digest}_{variant}.{extension}'
+            if settings.images['webp']:
+                keys[f'{variant}_webp'] = f'{dir1}/{digest[:2]}/{digest}_{variant}.webp'
+        return keys
+
+    @classmethod
+    async def upload_image(cls, uploaded_file: UploadFile, dir1: str) -> dict:
+        if uploaded_file is None:
+            return None
+        content = await cls.check_image(uploaded_file)
+        digest = hashlib.sha256(content).hexdigest()
+        keys = cls.image_keys(digest, dir1, cls.image_extensions[uploaded_file.content_type])
+        if not all([await storage.exists(key) for key in keys.values()]):
+            images = await ImageExecutorService.run(process_image, content, settings.images['variants'][dir1],
+                                                    settings.images['webp'], settings.images['max_pixels'])
+            for variant, key in keys.items():
+                await storage.save(key, images[variant])
+        return {variant: storage.path(key) for variant, key in keys.items()}
+
+    @classmethod
+    def primary_image(cls, variants: dict, dir1: str) -> str:
+        return variants[settings.images['primary'][dir1]] if variants else None
 
-        content = await uploaded_file.read()
-        bytes_image = io.BytesIO(content)
-        image = Image.open(bytes_image)
-        max_size = max_size if len(max_size) == 2 else None
-        max_size = image.size if max_size is None else max_size
-        image.thumbnail(max_size)
-        return image
+
+class CursorService:
+    @classmethod
+    def encode_cursor(cls, created: datetime, id_row: int) -> str:
+        data = json.dumps([created.isoformat(), id_row]).encode()
+        return base64.urlsafe_b64encode(data).decode()
+
+    @classmethod
+    def decode_cursor(cls, cursor: str) -> tuple:
+        try:
+            created, id_row = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(created), int(id_row)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail={'status': 400, 'data': {'errors': ['Invalid cursor']}})
+
+    @classmethod
+    def encode_rank_cursor(cls, rank: float, id_row: int) -> str:
+        return base64.urlsafe_b64encode(json.dumps([rank, id_row]).encode()).decode()
+
+    @classmethod
+    def decode_rank_cursor(cls, cursor: str) -> tuple:
+        try:
+            rank, id_row = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return float(rank), int(id_row)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail={'status': 400, 'data': {'errors': ['Invalid cursor']}})
+
+    @classmethod
+    def encode_id_cursor(cls, id_row: int) -> str:
+        return base64.urlsafe_b64encode(json.dumps([id_row]).encode()).decode()
+
+    @classmethod
+    def decode_id_cursor(cls, cursor: str) -> int:
+        try:
+            id_row, = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return int(id_row)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail={'status': 400, 'data': {'errors': ['Invalid cursor']}})
+
+
+class ETagService:
+    @classmethod
+    def make_etag(cls, *parts) -> str:
+        return '"' + hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest() + '"'
+
+    @classmethod
+    def not_modified(cls, request: Request, etag: str) -> bool:
+        if etag is None:
+            return False
+        if_none_match = request.headers.get('if-none-match')
+        if if_none_match is None:
+            return False
+        return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
 
     @classmethod
-    async def upload_image(cls, uploaded_file: UploadFile, dir1: str, dir2: str, max_size: tuple = None) -> str:
-        static_directory = f"static/{dir1}/{dir2}"
-        os.makedirs(static_directory, exist_ok=True)
-        image = await cls.check_image(uploaded_file, max_size)
-        image.save(f'{static_directory}/{uploaded_file.filename}')
-        return f'{static_directory}/{uploaded_file.filename}'
+    def not_modified_response(cls, etag: str) -> Response:
+        return Response(status_code=304, headers={'ETag': etag})
 
 
 class SignInData:
@@ -54,4 +194,4 @@ class GetCurrentUserService:
         )
 
     async def get_current_user(self, token):
-        return await UserService.get_jwt_user(token['access_token'])
+        return await UserService.get_jwt_user(token['access_token'], self.session)
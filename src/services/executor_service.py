@@ -0,0 +1,58 @@
+import asyncio
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+
+
+class ExecutorService(ABC):
+    executor: Executor = None
+    semaphore: asyncio.Semaphore = None
+    stats: dict = None
+
+    def __init_subclass__(cls, **kwargs):
+        # Subclasses are used through classmethods only, so check at definition rather than instantiation.
+        super().__init_subclass__(**kwargs)
+        if getattr(cls.get_config, '__isabstractmethod__', False):
+            raise TypeError(f'{cls.__name__} must implement get_config')
+        if cls.stats is None:
+            raise TypeError(f'{cls.__name__} must define its own stats')
+
+    @classmethod
+    @abstractmethod
+    def get_config(cls) -> dict:
+        ...
+
+    @classmethod
+    def get_executor(cls) -> Executor:
+        if cls.executor is None:
+            config = cls.get_config()
+            if config['executor'] == 'process':
+                cls.executor = ProcessPoolExecutor(max_workers=config['workers'])
+            else:
+                cls.executor = ThreadPoolExecutor(max_workers=config['workers'])
+        return cls.executor
+
+    @classmethod
+    async def run(cls, func, *args):
+        if cls.semaphore is None:
+            cls.semaphore = asyncio.Semaphore(cls.get_config()['concurrency'])
+        cls.stats['queued'] += 1
+        try:
+            await cls.semaphore.acquire()
+        finally:
+            cls.stats['queued'] -= 1
+        cls.stats['running'] += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(cls.get_executor(), func, *args)
+        finally:
+            cls.stats['running'] -= 1
+            cls.semaphore.release()
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        return dict(cls.stats)
+
+    @classmethod
+    def shutdown(cls):
+        if cls.executor is not None:
+            cls.executor.shutdown(wait=False)
+            cls.executor = None
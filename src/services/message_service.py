@@ -1,16 +1,98 @@
+import asyncio
 from typing import AsyncGenerator
 
 from fastapi import Depends, HTTPException
 from fastapi.exceptions import WebSocketException
 from fastapi.websockets import WebSocket
-from sqlalchemy import select, insert, and_, or_
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, insert, update, and_, or_, tuple_, case, union_all
+from sqlalchemy.orm import load_only
 
-from src.models.sessions import get_async_session
+from src.models.sessions import get_async_session, async_session
 from src.models.tables import User, Chat, Messages
 from src.schemas.user_schema import TokenUserSchema
-from src.services.auxiliary_service import GetCurrentUserService
+from src.services.auxiliary_service import GetCurrentUserService, CursorService
+from src.services.pubsub_service import get_pubsub
 from src.services.user_service import get_current_user
+from src.settings import settings
+
+
+class MessageWriter:
+    def __init__(self):
+        self.buffer: list = []
+        self.lock = asyncio.Lock()
+        self.timer: asyncio.Task = None
+        self.flushes: set = set()
+
+    async def write(self, values: dict):
+        future = asyncio.get_running_loop().create_future()
+        self.buffer.append((values, future))
+        if len(self.buffer) >= settings.chat['write_batch_size']:
+            self.start_flush()
+        elif self.timer is None:
+            self.timer = asyncio.create_task(self.flush_later())
+        # The batch is written by its own task, so cancelling one sender cannot strand the others.
+        await asyncio.shield(future)
+
+    def take_buffer(self) -> list:
+        buffer, self.buffer = self.buffer, []
+        return buffer
+
+    def start_flush(self):
+        task = asyncio.create_task(self.flush(self.take_buffer()))
+        self.flushes.add(task)
+        task.add_done_callback(self.flushes.discard)
+
+    async def flush_later(self):
+        await asyncio.sleep(settings.chat['write_interval'])
+        self.timer = None
+        await self.flush(self.take_buffer())
+
+    async def flush(self, buffer: list):
+        if not buffer:
+            return
+        error = None
+        try:
+            async with self.lock:
+                async with async_session() as session:
+                    messages = await session.execute(
+                        insert(Messages).returning(Messages.id, Messages.created, sort_by_parameter_order=True),
+                        [values for values, future in buffer]
+                    )
+                    chat_states = {}
+                    for (values, future), message in zip(buffer, messages.all()):
+                        chat_state = chat_states.setdefault(values['chat_id'], {'recipients': {}})
+                        recipients = chat_state['recipients']
+                        recipients[values['recipient_id']] = recipients.get(values['recipient_id'], 0) + 1
+                        chat_state['last'] = {'id': message.id, 'created': message.created, **values}
+                    for chat_id, chat_state in chat_states.items():
+                        await session.execute(MessageService.query_update_chat_state(
+                            chat_id, chat_state['recipients'], chat_state['last']))
+                    await session.commit()
+        except Exception as errData:
+            print('MessageWriter.flush -> ', errData)
+            error = errData
+        except BaseException:
+            error = RuntimeError('MessageWriter.flush was interrupted before the batch was written')
+            raise
+        finally:
+            for values, future in buffer:
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+
+    async def close(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        await self.flush(self.take_buffer())
+        if self.flushes:
+            await asyncio.gather(*self.flushes, return_exceptions=True)
+
+
+message_writer = MessageWriter()
 
 
 class MessageService:
@@ -41,10 +123,10 @@ class MessageService:
         chat = await self.session.execute(select(Chat).filter(
             or_(and_(Chat.user_chat_1_id == self.user_id, Chat.user_chat_2_id == user_id),
                 and_(Chat.user_chat_1_id == user_id, Chat.user_chat_2_id == self.user_id))
-        ).options(selectinload(Chat.messages)))
+        ))
         chat = chat.scalars().one_or_none()
         if chat is None:
-            await self.create_chat(user_id)
+            return await self.create_chat(user_id)
         return chat
 
     async def create_chat(self, user_id):
@@ -59,25 +141,111 @@ class MessageService:
         else:
             user = ws['user']
             chat = ws['chat']
-        await self.session.execute(insert(Messages).values(
-            sender_id=self.user_id, recipient_id=user_id, chat_id=chat.id, message=message
+        values = {'sender_id': self.user_id, 'recipient_id': user_id, 'chat_id': chat.id, 'message': message}
+        if settings.chat['write_behind']:
+            # Hand the pooled connection back first: the batch flush needs one of its own.
+            await self.session.commit()
+            await message_writer.write(values)
+        else:
+            message_row = await self.session.execute(insert(Messages).values(**values)
+                                                     .returning(Messages.id, Messages.created))
+            message_row = message_row.one()
+            await self.session.execute(self.query_update_chat_state(
+                chat.id, {user_id: 1}, {'id': message_row.id, 'created': message_row.created, **values}))
+            await self.session.commit()
+        return {'status': 201, 'data': {'username': user.username, 'message': message}}
+
+    @classmethod
+    def query_update_chat_state(cls, chat_id, recipients: dict, last: dict):
+        return update(Chat).filter(Chat.id == chat_id).values(
+            last_message_id=last['id'],
+            last_message_preview=last['message'][:150],
+            last_message_at=last['created'],
+            last_sender_id=last['sender_id'],
+            unread_1=Chat.unread_1 + sum(case((Chat.user_chat_1_id == recipient_id, count), else_=0)
+                                         for recipient_id, count in recipients.items()),
+            unread_2=Chat.unread_2 + sum(case((Chat.user_chat_2_id == recipient_id, count), else_=0)
+                                         for recipient_id, count in recipients.items())
+        )
+
+    async def mark_read(self, username):
+        user = await self.get_user(username, filter_field='username')
+        chat = await self.get_chat(user.id)
+        await self.session.execute(update(Chat).filter(Chat.id == chat.id).values(
+            unread_1=case((Chat.user_chat_1_id == self.user_id, 0), else_=Chat.unread_1),
+            unread_2=case((Chat.user_chat_2_id == self.user_id, 0), else_=Chat.unread_2)
         ))
         await self.session.commit()
-        return {'status': 201, 'data': {'username': 'user.username', 'message': message}}
+        return {'status': 200, 'data': {'username': user.username, 'unread': 0}}
+
+    @classmethod
+    def query_inbox_side(cls, user_column, companion_column, unread_column, user_id, cursor, limit):
+        query_sql = select(Chat.id.label('chat_id'), companion_column.label('companion_id'),
+                           unread_column.label('unread'), Chat.last_message_id, Chat.last_message_preview,
+                           Chat.last_message_at, Chat.last_sender_id) \
+            .filter(user_column == user_id, Chat.last_message_at.is_not(None))
+        if cursor:
+            last_message_at, id_chat = CursorService.decode_cursor(cursor)
+            query_sql = query_sql.filter(tuple_(Chat.last_message_at, Chat.id) < tuple_(last_message_at, id_chat))
+        return query_sql.order_by(Chat.last_message_at.desc(), Chat.id.desc()).limit(limit + 1)
+
+    async def get_inbox(self, cursor: str = None, limit: int = None):
+        limit = limit or settings.pagination['limit']
+        inbox = union_all(
+            self.query_inbox_side(Chat.user_chat_1_id, Chat.user_chat_2_id, Chat.unread_1, self.user_id, cursor, limit),
+            self.query_inbox_side(Chat.user_chat_2_id, Chat.user_chat_1_id, Chat.unread_2, self.user_id, cursor, limit)
+        ).subquery()
+        chats = await self.session.execute(
+            select(inbox, User.username)
+                .join(User, User.id == inbox.c.companion_id)
+                .order_by(inbox.c.last_message_at.desc(), inbox.c.chat_id.desc())
+                .limit(limit + 1)
+        )
+        chats = chats.all()
+
+        next_cursor = None
+        if len(chats) > limit:
+            chats = chats[:limit]
+            next_cursor = CursorService.encode_cursor(chats[-1].last_message_at, chats[-1].chat_id)
+        return {'status': 200, 'data': {'chats': [
+            {'chat_id': chat.chat_id, 'username': chat.username, 'unread': chat.unread,
+             'last_message_id': chat.last_message_id, 'last_message': chat.last_message_preview,
+             'last_message_at': chat.last_message_at, 'last_message_outgoing': chat.last_sender_id == self.user_id}
+            for chat in chats], 'next_cursor': next_cursor}}
+
+    async def get_messages(self, chat, before: str = None, limit: int = None):
+        limit = limit or settings.pagination['limit']
+        query_sql = select(Messages) \
+            .filter(Messages.chat_id == chat.id) \
+            .options(load_only(Messages.id, Messages.sender_id, Messages.message, Messages.created))
+        if before:
+            created, id_message = CursorService.decode_cursor(before)
+            query_sql = query_sql.filter(tuple_(Messages.created, Messages.id) < tuple_(created, id_message))
+        messages = await self.session.execute(query_sql
+                                              .order_by(Messages.created.desc(), Messages.id.desc())
+                                              .limit(limit + 1))
+        messages = messages.scalars().all()
 
-    async def build_chat(self, user, chat):
+        next_before = None
+        if len(messages) > limit:
+            messages = messages[:limit]
+            next_before = CursorService.encode_cursor(messages[-1].created, messages[-1].id)
+        return {'messages': messages[::-1], 'before': next_before}
+
+    async def build_chat(self, user, messages):
         chat_messages = []
-        for message in chat.messages:
+        for message in messages:
             chat_message = {'type': 'incoming' if message.sender_id == user.id else 'outgoing',
                             'message': message.message, 'created': message.created}
             chat_messages.append(chat_message)
         return {user.username: chat_messages}
 
-    async def chat(self, username):
+    async def chat(self, username, before: str = None, limit: int = None):
         user = await self.get_user(username, filter_field='username')
         chat = await self.get_chat(user.id)
-        chat_messages = await self.build_chat(user, chat)
-        return {'messages': chat_messages}
+        messages = await self.get_messages(chat, before, limit)
+        chat_messages = await self.build_chat(user, messages['messages'])
+        return {'messages': chat_messages, 'before': messages['before']}
 
 
 class MessageAuxiliaryService(MessageService):
@@ -96,28 +264,97 @@ class MessageAuxiliaryService(MessageService):
         self.username = self.current_user['username']
 
 
+class ConnectionWriter:
+    def __init__(self, websocket: WebSocket, stats: dict):
+        self.websocket = websocket
+        self.stats = stats
+        self.closed = False
+        self.closing = None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.chat['send_queue_size'])
+        self.task = asyncio.create_task(self.write())
+
+    async def write(self):
+        try:
+            while True:
+                frame = await self.queue.get()
+                await self.websocket.send_json(frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception as errData:
+            print('ConnectionWriter.write -> ', errData)
+
+    def put(self, frame: dict):
+        if self.closed:
+            return
+        if self.queue.full():
+            self.stats['dropped_frames'] += 1
+            if settings.chat['overflow_policy'] == 'disconnect':
+                self.stats['disconnected'] += 1
+                self.close()
+                self.closing = asyncio.create_task(self.close_websocket(code=1013))
+                return
+            self.queue.get_nowait()
+        self.queue.put_nowait(frame)
+
+    async def close_websocket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception as errData:
+            print('ConnectionWriter.close_websocket -> ', errData)
+
+    def close(self):
+        self.closed = True
+        self.task.cancel()
+
+
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, pubsub=None):
         self.chat_users: dict = {}
+        self.connection_users: dict = {}
+        self.writers: dict = {}
+        self.stats: dict = {'dropped_frames': 0, 'disconnected': 0}
+        self.pubsub = get_pubsub() if pubsub is None else pubsub
 
-    async def connect(self, websocket: WebSocket, chat_websocket):
+    async def connect(self, websocket: WebSocket, chat_websocket, user_id):
         await websocket.accept()
+        self.connection_users[websocket] = user_id
+        self.writers[websocket] = ConnectionWriter(websocket, self.stats)
         if not chat_websocket in self.chat_users:
             self.chat_users[chat_websocket] = []
             self.chat_users[chat_websocket].append(websocket)
+            await self.pubsub.subscribe(chat_websocket, self.deliver)
         else:
             self.chat_users[chat_websocket].append(websocket)
 
-    def disconnect(self, websocket: WebSocket, chat_websocket):
+    async def disconnect(self, websocket: WebSocket, chat_websocket):
+        self.connection_users.pop(websocket, None)
+        writer = self.writers.pop(websocket, None)
+        if writer is not None:
+            writer.close()
         if chat_websocket in self.chat_users:
             self.chat_users[chat_websocket].remove(websocket)
+            if not self.chat_users[chat_websocket]:
+                del self.chat_users[chat_websocket]
+                await self.pubsub.unsubscribe(chat_websocket)
 
     async def broadcast(self, websocket: WebSocket, chat_websocket, user, chat, message: str,
                         service: MessageAuxiliaryService):
         await service.send_message(user.id, message, ws={'user': user, 'chat': chat})
-        if chat_websocket in self.chat_users:
-            for connection in self.chat_users[chat_websocket]:
-                if connection == websocket:
-                    await connection.send_json({'user': 'i', 'message': message})
-                else:
-                    await connection.send_json({'user': 'companion', 'message': message})
+        await self.pubsub.publish(chat_websocket, {'sender_id': service.user_id, 'message': message})
+
+    async def deliver(self, chat_websocket, data: dict):
+        for connection in list(self.chat_users.get(chat_websocket, [])):
+            writer = self.writers.get(connection)
+            if writer is None:
+                continue
+            if self.connection_users.get(connection) == data['sender_id']:
+                writer.put({'user': 'i', 'message': data['message']})
+            else:
+                writer.put({'user': 'companion', 'message': data['message']})
+
+    def get_stats(self) -> dict:
+        queue_depths = [writer.queue.qsize() for writer in self.writers.values()]
+        return {'connections': len(self.writers),
+                'queue_depth': sum(queue_depths),
+                'max_queue_depth': max(queue_depths, default=0),
+                **self.stats}
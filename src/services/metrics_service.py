@@ -0,0 +1,77 @@
+import bisect
+import time
+
+from src.settings import settings
+
+
+class MetricsService:
+    requests: dict = {}
+    durations: dict = {}
+    route_paths: dict = None
+
+    @classmethod
+    def get_route(cls, scope) -> str:
+        if cls.route_paths is None:
+            cls.route_paths = {route.endpoint: route.path for route in scope['app'].routes
+                               if hasattr(route, 'endpoint')}
+        return cls.route_paths.get(scope.get('endpoint'), 'unmatched')
+
+    @classmethod
+    def observe(cls, method: str, route: str, status: int, duration: float):
+        key = (method, route, status)
+        cls.requests[key] = cls.requests.get(key, 0) + 1
+        histogram = cls.durations.get((method, route))
+        if histogram is None:
+            histogram = cls.durations[(method, route)] = [[0] * (len(settings.metrics['buckets']) + 1), 0.0]
+        histogram[0][bisect.bisect_left(settings.metrics['buckets'], duration)] += 1
+        histogram[1] += duration
+
+    @classmethod
+    def format_labels(cls, labels: dict) -> str:
+        if not labels:
+            return ''
+        return '{' + ','.join(f'{name}="{str(value)}"' for name, value in labels.items()) + '}'
+
+    @classmethod
+    def render(cls, gauges: list) -> str:
+        lines = ['# TYPE http_requests_total counter']
+        for (method, route, status), count in sorted(cls.requests.items()):
+            labels = cls.format_labels({'method': method, 'route': route, 'status': status})
+            lines.append(f'http_requests_total{labels} {count}')
+
+        lines.append('# TYPE http_request_duration_seconds histogram')
+        for (method, route), (buckets, total) in sorted(cls.durations.items()):
+            cumulative = 0
+            for bound, count in zip(settings.metrics['buckets'] + ['+Inf'], buckets):
+                cumulative += count
+                labels = cls.format_labels({'method': method, 'route': route, 'le': bound})
+                lines.append(f'http_request_duration_seconds_bucket{labels} {cumulative}')
+            labels = cls.format_labels({'method': method, 'route': route})
+            lines.append(f'http_request_duration_seconds_sum{labels} {total}')
+            lines.append(f'http_request_duration_seconds_count{labels} {cumulative}')
+
+        for name, labels, value in gauges:
+            lines.append(f'{name}{cls.format_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            MetricsService.observe(scope['method'], MetricsService.get_route(scope), status[0],
+                                   time.perf_counter() - start)
@@ -1,15 +1,16 @@
 from typing import AsyncGenerator
 
 from fastapi import HTTPException, Depends
-from sqlalchemy import insert, select, update, delete
+from sqlalchemy import insert, select, update, delete, tuple_, union, literal, func, DateTime
 from sqlalchemy.orm import load_only, selectinload
 
 from src.models.sessions import get_async_session
-from src.models.tables import Post, User
-from src.schemas.post_schema import PostSchema, SortedPostSchema
+from src.models.tables import Post, User, Friend, Timeline
+from src.schemas.post_schema import SortedPostSchema
 from src.schemas.user_schema import TokenUserSchema
-from src.services.auxiliary_service import UploadFileService
+from src.services.auxiliary_service import UploadFileService, CursorService, ETagService
 from src.services.user_service import get_current_user
+from src.settings import settings
 
 
 class PostService:
@@ -29,96 +30,219 @@ class PostService:
             raise HTTPException(status_code=404, detail={'status': 404, 'data': {'messages': ["Item not found"]}})
         return post
 
-    async def get_posts(self) -> PostSchema:
-        try:
-            posts = await self.session.execute(select(Post)
-                                               .filter(Post.user_id == self.user_id)
-                                               .options(load_only(Post.id, Post.image_path, Post.text, Post.created)))
-            posts = posts.scalars().all()
-        except Exception as errData:
-            print('PostService.get_posts -> ', errData)
-        return posts if 'posts' in locals() else []
+    async def get_posts(self, cursor: str = None, limit: int = None):
+        query_sql = select(Post) \
+            .filter(Post.user_id == self.user_id) \
+            .options(load_only(Post.id, Post.image_path, Post.image_variants, Post.text, Post.created))
+        query_sql = self.query_sorted_post(SortedPostSchema.descending, query_sql)
+        return await self.paginate_posts(query_sql, SortedPostSchema.descending, cursor, limit)
 
-    async def query_filter_user(self, filter_user: str, query_sql=None):
-        try:
-            user = await self.session.execute(select(User)
-                                              .filter(User.username == filter_user))
-            user_post = user.scalars().one_or_none()
-        except Exception as errData:
-            print('PostService.query_filter_user -> ', errData)
-        if user_post:
-            query_sql = select(Post) \
-                .filter(Post.user_id == int(user_post.id)) \
-                .options(load_only(Post.id, Post.text, Post.image_path, Post.created))
+    @classmethod
+    def query_filter_user(cls, filter_user: str, query_sql):
+        if filter_user:
+            query_sql = query_sql.filter(
+                Post.user_id == select(User.id).filter(User.username == filter_user).scalar_subquery()
+            )
         return query_sql
 
     @classmethod
     def query_sorted_post(cls, sorted_create: SortedPostSchema, query_sql=None):
-        if sorted_create and query_sql is not None:
-            if sorted_create == 'descending':
-                query_sql = query_sql.order_by(Post.created.desc())
+        if query_sql is not None:
             if sorted_create == 'ascending':
-                query_sql = query_sql.order_by(Post.created)
+                query_sql = query_sql.order_by(Post.created, Post.id)
+            else:
+                query_sql = query_sql.order_by(Post.created.desc(), Post.id.desc())
         return query_sql
 
-    async def get_posts_all(self, filter_user: str = None, sorted_create: SortedPostSchema = None):
-        posts = []
-
-        if filter_user:
-            query_sql = await self.query_filter_user(filter_user)
-        else:
-            query_sql = select(Post) \
-                .options(
-                load_only(Post.id, Post.text, Post.image_path, Post.created),
-                selectinload(Post.user)
-                    .load_only(User.username))
+    @classmethod
+    def query_cursor_post(cls, sorted_create: SortedPostSchema, cursor: str, query_sql=None):
+        if cursor and query_sql is not None:
+            created, id_post = CursorService.decode_cursor(cursor)
+            if sorted_create == 'ascending':
+                query_sql = query_sql.filter(tuple_(Post.created, Post.id) > tuple_(created, id_post))
+            else:
+                query_sql = query_sql.filter(tuple_(Post.created, Post.id) < tuple_(created, id_post))
+        return query_sql
 
-        query_sql = self.query_sorted_post(sorted_create, query_sql)
+    async def paginate_posts(self, query_sql, sorted_create: SortedPostSchema = None,
+                             cursor: str = None, limit: int = None):
+        posts = []
+        limit = limit or settings.pagination['limit']
+        query_sql = self.query_cursor_post(sorted_create, cursor, query_sql)
 
         if query_sql is not None:
             try:
-                posts = await self.session.execute(query_sql)
+                posts = await self.session.execute(query_sql.limit(limit + 1))
                 posts = posts.scalars().all()
             except Exception as errData:
-                print('PostService.get_posts_all -> ', errData)
-        return posts
+                print('PostService.paginate_posts -> ', errData)
+                posts = []
+
+        next_cursor = None
+        if len(posts) > limit:
+            posts = posts[:limit]
+            next_cursor = CursorService.encode_cursor(posts[-1].created, posts[-1].id)
+        return {'posts': posts, 'next_cursor': next_cursor}
+
+    async def get_posts_all(self, filter_user: str = None, sorted_create: SortedPostSchema = None,
+                            cursor: str = None, limit: int = None):
+        query_sql = select(Post) \
+            .options(
+            load_only(Post.id, Post.text, Post.image_path, Post.image_variants, Post.created),
+            selectinload(Post.user)
+                .load_only(User.username))
+
+        query_sql = self.query_filter_user(filter_user, query_sql)
+        query_sql = self.query_sorted_post(sorted_create, query_sql)
+        posts = await self.paginate_posts(query_sql, sorted_create, cursor, limit)
+        return {'posts': [self.build_post(post) for post in posts['posts']], 'next_cursor': posts['next_cursor']}
+
+    @classmethod
+    def build_post(cls, post) -> dict:
+        return {'id': post.id,
+                'image_path': post.image_path,
+                'image_variants': post.image_variants,
+                'text': post.text,
+                'created': post.created,
+                'user': {'username': post.user.username}}
+
+    async def get_posts_all_etag(self, filter_user: str = None, sorted_create: SortedPostSchema = None,
+                                 cursor: str = None, limit: int = None) -> str:
+        limit = limit or settings.pagination['limit']
+        query_sql = self.query_filter_user(filter_user, select(Post.id, Post.updated))
+        query_sql = self.query_sorted_post(sorted_create, query_sql)
+        query_sql = self.query_cursor_post(sorted_create, cursor, query_sql)
+        posts = await self.session.execute(query_sql.limit(limit + 1))
+        return ETagService.make_etag('posts', filter_user, sorted_create, cursor, limit,
+                                     *[f'{post.id}:{post.updated.isoformat()}' for post in posts.all()])
+
+    async def search_posts(self, search: str, cursor: str = None, limit: int = None):
+        limit = limit or settings.pagination['limit']
+        query = func.websearch_to_tsquery('simple', search)
+        rank = func.ts_rank(Post.search_vector, query)
+        query_sql = select(Post.id, Post.image_path, Post.image_variants, Post.text, Post.created,
+                           rank.label('rank')) \
+            .filter(Post.search_vector.bool_op('@@')(query))
+        if cursor:
+            cursor_rank, id_post = CursorService.decode_rank_cursor(cursor)
+            query_sql = query_sql.filter(tuple_(rank, Post.id) < tuple_(cursor_rank, id_post))
+        posts = await self.session.execute(query_sql.order_by(rank.desc(), Post.id.desc()).limit(limit + 1))
+        posts = posts.all()
+
+        next_cursor = None
+        if len(posts) > limit:
+            posts = posts[:limit]
+            next_cursor = CursorService.encode_rank_cursor(posts[-1].rank, posts[-1].id)
+        return {'posts': [{'id': post.id, 'image_path': post.image_path, 'image_variants': post.image_variants,
+                           'text': post.text, 'created': post.created, 'user': None} for post in posts],
+                'next_cursor': next_cursor}
+
+    @classmethod
+    def query_audience(cls, user_id: int):
+        followers = select(Friend.follower_user_id.label('user_id')).filter(Friend.following_user_id == user_id)
+        friends = select(Friend.following_user_id.label('user_id')) \
+            .filter(Friend.follower_user_id == user_id, Friend.friends == True)
+        return union(followers, friends, select(literal(user_id).label('user_id'))).subquery()
+
+    @classmethod
+    def query_followed(cls, user_id: int):
+        followings = select(Friend.following_user_id.label('user_id')).filter(Friend.follower_user_id == user_id)
+        friends = select(Friend.follower_user_id.label('user_id')) \
+            .filter(Friend.following_user_id == user_id, Friend.friends == True)
+        return union(followings, friends).subquery()
+
+    async def fan_out_post(self, post):
+        fanout_limit = settings.feed['fanout_limit']
+        audience = self.query_audience(post.user_id)
+        fanout_on_read = await self.session.execute(select(User.fanout_on_read).filter(User.id == post.user_id))
+        fanout_on_read = fanout_on_read.scalar_one()
+        if not fanout_on_read:
+            audience_count = await self.session.execute(
+                select(func.count()).select_from(select(audience.c.user_id).limit(fanout_limit + 1).subquery()))
+            if audience_count.scalar_one() > fanout_limit:
+                await self.session.execute(update(User).filter(User.id == post.user_id).values(fanout_on_read=True))
+                fanout_on_read = True
+        if fanout_on_read:
+            audience = select(literal(post.user_id).label('user_id')).subquery()
+        await self.session.execute(insert(Timeline).from_select(
+            ['user_id', 'post_id', 'created'],
+            select(audience.c.user_id, literal(post.id), literal(post.created, DateTime))
+        ))
+
+    async def get_feed(self, cursor: str = None, limit: int = None):
+        limit = limit or settings.pagination['limit']
+        timeline = select(Timeline.post_id, Timeline.created).filter(Timeline.user_id == self.user_id)
+        fanout_on_read = select(Post.id.label('post_id'), Post.created).filter(Post.user_id.in_(
+            select(User.id).filter(User.fanout_on_read == True,
+                                   User.id.in_(select(self.query_followed(self.user_id).c.user_id)))
+        ))
+        if cursor:
+            created, id_post = CursorService.decode_cursor(cursor)
+            timeline = timeline.filter(tuple_(Timeline.created, Timeline.post_id) < tuple_(created, id_post))
+            fanout_on_read = fanout_on_read.filter(tuple_(Post.created, Post.id) < tuple_(created, id_post))
+        timeline = timeline.order_by(Timeline.created.desc(), Timeline.post_id.desc()).limit(limit + 1)
+        fanout_on_read = fanout_on_read.order_by(Post.created.desc(), Post.id.desc()).limit(limit + 1)
+        feed = union(timeline, fanout_on_read).subquery()
+
+        posts = await self.session.execute(
+            select(Post)
+                .join(feed, Post.id == feed.c.post_id)
+                .order_by(feed.c.created.desc(), feed.c.post_id.desc())
+                .limit(limit + 1)
+                .options(load_only(Post.id, Post.text, Post.image_path, Post.image_variants, Post.created),
+                         selectinload(Post.user).load_only(User.username))
+        )
+        posts = posts.scalars().all()
+
+        next_cursor = None
+        if len(posts) > limit:
+            posts = posts[:limit]
+            next_cursor = CursorService.encode_cursor(posts[-1].created, posts[-1].id)
+        return {'posts': [self.build_post(post) for post in posts], 'next_cursor': next_cursor}
 
     async def create_post(self, text, uploaded_file):
-        image_path = await UploadFileService.upload_image(uploaded_file, 'user_posts',
-                                                          self.current_user['username'], (400, 400))
+        image_variants = await UploadFileService.upload_image(uploaded_file, 'user_posts')
+        image_path = UploadFileService.primary_image(image_variants, 'user_posts')
         try:
             user_id = int(self.current_user['id'])
             post = await self.session.execute(insert(Post).
-                                              values(text=text, user_id=user_id, image_path=image_path)
+                                              values(text=text, user_id=user_id, image_path=image_path,
+                                                     image_variants=image_variants)
                                               .returning(Post))
+            post = post.scalars().one()
+            await self.fan_out_post(post)
         except Exception as errData:
             print('PostService.create_post -> ', errData)
         await self.session.commit()
-        post = post.scalars().one()
-        post = {'id': post.id, 'text': post.text, 'image_path': post.image_path, 'created': post.created}
+        post = {'id': post.id, 'text': post.text, 'image_path': post.image_path,
+                'image_variants': post.image_variants, 'created': post.created}
         return {'status': 201, 'data': {'message': 'resource created successfully', 'post': post}}
 
     async def update_post(self, id_post: int, text: str, image):
         post = await self.get_post(id_post)
         text = post.text if text is None else text
         if image is None:
+            image_variants = post.image_variants
             image = post.image_path
         else:
-            image = await UploadFileService.upload_image(image, 'user_posts', self.current_user['username'], (400, 400))
+            image_variants = await UploadFileService.upload_image(image, 'user_posts')
+            image = UploadFileService.primary_image(image_variants, 'user_posts')
         post = await self.session.execute(
             update(Post)
                 .filter(Post.id == id_post, Post.user_id == self.user_id)
-                .values(text=text, image_path=image)
+                .values(text=text, image_path=image, image_variants=image_variants)
                 .returning(Post)
         )
         await self.session.commit()
         post = post.scalars().one()
-        post = {'id': post.id, 'text': post.text, 'image_path': post.image_path, 'created': post.created}
+        post = {'id': post.id, 'text': post.text, 'image_path': post.image_path,
+                'image_variants': post.image_variants, 'created': post.created}
         return {'status': 204, 'data': {'message': 'resource updated successfully', 'post': post, }}
 
     async def delete_post(self, id_post: int):
         post = await self.get_post(id_post)
         await self.session.execute(delete(Post).where(Post.id == post.id))
-        post = {'id': post.id, 'text': post.text, 'image_path': post.image_path, 'created': post.created}
+        post = {'id': post.id, 'text': post.text, 'image_path': post.image_path,
+                'image_variants': post.image_variants, 'created': post.created}
         await self.session.commit()
         return {'status': 202, 'data': {'message': 'resource deleted successfully', 'post': post, }}
@@ -1,15 +1,16 @@
-import os
 from typing import AsyncGenerator
 
 from fastapi import Depends, HTTPException
-from sqlalchemy import select, insert, update, delete, or_, and_
-from sqlalchemy.orm import load_only, selectinload
+from sqlalchemy import select, insert, update, delete, or_, and_, func, union, union_all, intersect
+from sqlalchemy.orm import load_only, contains_eager
 
 from src.models.sessions import get_async_session
 from src.models.tables import Profile, User, Friend
+from src.schemas.profile_schema import ProfileSearchMatch
 from src.schemas.user_schema import TokenUserSchema
-from src.services.user_service import get_current_user
-from src.services.auxiliary_service import UploadFileService
+from src.services.user_service import get_current_user, AuthCacheService
+from src.services.auxiliary_service import UploadFileService, CursorService, ETagService
+from src.settings import settings
 
 
 class ProfileService:
@@ -31,7 +32,8 @@ class ProfileService:
 
         profile = await self.session.execute(select(Profile).filter(Profile.user_id == int(user_id)).options(
             load_only(Profile.id, Profile.date_of_birth, Profile.city_of_birth, Profile.city_of_residence,
-                      Profile.family_status, Profile.photography, Profile.additional_information)
+                      Profile.family_status, Profile.photography, Profile.photography_variants,
+                      Profile.additional_information)
                 .selectinload(Profile.user).load_only(User.id, User.username, User.first_name, User.last_name)
         ))
 
@@ -41,6 +43,19 @@ class ProfileService:
             return await self.create_profile()
         elif profile is None:
             raise HTTPException(status_code=404, detail={'status': 404, 'data': {'errors': 'page not found'}})
+        return self.build_profile(profile)
+
+    async def get_profile_etag(self, user_id) -> str:
+        versions = await self.session.execute(select(Profile.id, Profile.updated, User.updated.label('user_updated'))
+                                              .join(Profile.user).filter(Profile.user_id == int(user_id)))
+        versions = versions.one_or_none()
+        if versions is None:
+            return None
+        return ETagService.make_etag('profile', versions.id, versions.updated.isoformat(),
+                                     versions.user_updated.isoformat())
+
+    @classmethod
+    def build_profile(cls, profile) -> dict:
         return {'user_id': profile.user.id,
                 'profile_id': profile.id,
                 'username': profile.user.username,
@@ -51,36 +66,53 @@ class ProfileService:
                 'city_of_residence': profile.city_of_residence,
                 'family_status': profile.family_status,
                 'photography': profile.photography,
+                'photography_variants': profile.photography_variants,
                 'additional_information': profile.additional_information}
 
-    async def get_profiles(self):
+    @classmethod
+    def query_search_profile_ids(cls, search: str, match: ProfileSearchMatch, after_id: int = None):
+        # One subquery per table, so each can use its own trigram indexes; an OR across the join cannot.
+        search = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        pattern = f'{search}%' if match == 'prefix' else f'%{search}%'
+        by_user = select(Profile.id).join(Profile.user).filter(or_(User.username.ilike(pattern, escape='\\'),
+                                                                   User.first_name.ilike(pattern, escape='\\'),
+                                                                   User.last_name.ilike(pattern, escape='\\')))
+        by_city = select(Profile.id).filter(Profile.city_of_residence.ilike(pattern, escape='\\'))
+        if after_id is not None:
+            by_user = by_user.filter(Profile.id > after_id)
+            by_city = by_city.filter(Profile.id > after_id)
+        return union(by_user, by_city)
+
+    async def get_profiles(self, search: str = None, match: ProfileSearchMatch = None,
+                           cursor: str = None, limit: int = None):
+        limit = limit or settings.pagination['limit']
+        after_id = CursorService.decode_id_cursor(cursor) if cursor else None
+        query_sql = select(Profile).join(Profile.user).options(
+            load_only(Profile.id, Profile.date_of_birth, Profile.city_of_birth, Profile.city_of_residence,
+                      Profile.family_status, Profile.photography, Profile.photography_variants,
+                      Profile.additional_information),
+            contains_eager(Profile.user).load_only(User.id, User.username, User.first_name, User.last_name)
+        )
+        if search:
+            query_sql = query_sql.filter(Profile.id.in_(self.query_search_profile_ids(search, match, after_id)))
+        if after_id is not None:
+            query_sql = query_sql.filter(Profile.id > after_id)
         try:
-            profiles = await self.session.execute(select(Profile).options(
-                load_only(Profile.id, Profile.date_of_birth, Profile.city_of_birth, Profile.city_of_residence,
-                          Profile.family_status, Profile.photography, Profile.additional_information)
-                    .selectinload(Profile.user).load_only(User.id, User.username, User.first_name, User.last_name)
-            ))
+            profiles = await self.session.execute(query_sql.order_by(Profile.id).limit(limit + 1))
         except Exception as errData:
             print('ProfileService.get_profiles -> : ', errData)
-            return HTTPException(status_code=500, detail={'status': 500, 'data': {'errors': 'server error'}})
+            raise HTTPException(status_code=500, detail={'status': 500, 'data': {'errors': 'server error'}})
         profiles = profiles.scalars().all()
-        return [{'user_id': profile.user.id,
-                 'profile_id': profile.id,
-                 'username': profile.user.username,
-                 'first_name': profile.user.first_name,
-                 'last_name': profile.user.last_name,
-                 'date_of_birth': profile.date_of_birth,
-                 'city_of_birth': profile.city_of_birth,
-                 'city_of_residence': profile.city_of_residence,
-                 'family_status': profile.family_status,
-                 'photography': profile.photography,
-                 'additional_information': profile.additional_information} for profile in profiles]
+
+        next_cursor = None
+        if len(profiles) > limit:
+            profiles = profiles[:limit]
+            next_cursor = CursorService.encode_id_cursor(profiles[-1].id)
+        return {'profiles': [self.build_profile(profile) for profile in profiles], 'next_cursor': next_cursor}
 
     async def update_profile(self, profile):
-        uploded_file = None
-        if profile.photography is not None:
-            uploded_file = await UploadFileService.upload_image(profile.photography, 'user_profiles',
-                                                                self.current_user['username'], (300, 700))
+        uploded_variants = await UploadFileService.upload_image(profile.photography, 'user_profiles')
+        uploded_file = UploadFileService.primary_image(uploded_variants, 'user_profiles')
         try:
             await self.session.execute(update(User)
                                        .filter(User.id == self.user_id)
@@ -92,13 +124,13 @@ class ProfileService:
                                                city_of_residence=profile.city_of_residence,
                                                family_status=profile.family_status,
                                                photography=uploded_file,
+                                               photography_variants=uploded_variants,
                                                additional_information=profile.additional_information))
 
             await self.session.commit()
+            AuthCacheService.invalidate_user(self.user_id)
         except Exception as errData:
             print('ProfileService.update_profile -> ', errData)
-            if uploded_file is not None:
-                os.remove(uploded_file)
             raise HTTPException(status_code=500, detail={'status': 500, 'data': {'errors': 'server error'}})
 
         profile = await self.profile()
@@ -158,35 +190,88 @@ class ProfileService:
 
         raise HTTPException(status_code=500, detail={'status': 500, 'data': {'errors': 'server error'}})
 
-    async def get_friend(self, type):
+    @classmethod
+    def query_friend_ids(cls, user_id):
+        return union(
+            select(Friend.following_user_id).filter(Friend.follower_user_id == user_id, Friend.friends == True),
+            select(Friend.follower_user_id).filter(Friend.following_user_id == user_id, Friend.friends == True)
+        )
+
+    @classmethod
+    def query_following_ids(cls, user_id):
+        return select(Friend.following_user_id).filter(Friend.follower_user_id == user_id, Friend.friends != True)
+
+    @classmethod
+    def query_follower_ids(cls, user_id):
+        return select(Friend.follower_user_id).filter(Friend.following_user_id == user_id, Friend.friends != True)
+
+    @classmethod
+    def query_related_ids(cls, user_id):
+        return union(select(Friend.following_user_id).filter(Friend.follower_user_id == user_id),
+                     select(Friend.follower_user_id).filter(Friend.following_user_id == user_id))
+
+    async def paginate_users(self, ids_query, cursor: str = None, limit: int = None):
+        limit = limit or settings.pagination['limit']
+        ids = ids_query.subquery()
+        query_sql = select(User.id, User.username).filter(User.id.in_(select(ids.c[0])))
+        if cursor:
+            query_sql = query_sql.filter(User.id > CursorService.decode_id_cursor(cursor))
+        users = await self.session.execute(query_sql.order_by(User.id).limit(limit + 1))
+        users = [{'id': user.id, 'username': user.username} for user in users.all()]
+
+        next_cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            next_cursor = CursorService.encode_id_cursor(users[-1]['id'])
+        return {'users': users, 'next_cursor': next_cursor}
+
+    async def get_friend(self, type, cursor: str = None, limit: int = None):
         if type not in ['friends', 'followers', 'followings']:
             raise HTTPException(status_code=404, detail={'status': 404, 'data': {'errors': 'page not found'}})
         if type == 'friends':
-            friends = await self.session.execute(select(Friend).filter(or_(
-                and_(Friend.following_user_id == self.user_id, Friend.friends == True),
-                and_(Friend.follower_user_id == self.user_id, Friend.friends == True))
-            ).options(
-                load_only(Friend.id, Friend.friends),
-                selectinload(Friend.follower_user).load_only(User.id, User.username),
-                selectinload(Friend.following_user).load_only(User.id, User.username)
-            ))
-            friends = friends.scalars().all()
-            friends = [el.following_user if el.follower_user.id == self.user_id else el.follower_user
-                       for el in friends]
-            return {'status': 202, 'data': {'friends': friends}}
+            friends = await self.paginate_users(self.query_friend_ids(self.user_id), cursor, limit)
+            return {'status': 202, 'data': {'friends': friends['users'], 'next_cursor': friends['next_cursor']}}
         if type == 'followings':
-            followers = await self.session.execute(
-                select(Friend)
-                    .filter(Friend.follower_user_id == self.user_id, Friend.friends != True)
-                    .options(load_only(Friend.id),
-                             selectinload(Friend.following_user).load_only(User.id, User.username)))
-            followers = followers.scalars().all()
-            return {'status': 202, 'data': {'followers': followers}}
+            followers = await self.paginate_users(self.query_following_ids(self.user_id), cursor, limit)
         if type == 'followers':
-            followers = await self.session.execute(
-                select(Friend)
-                    .filter(Friend.following_user_id == self.user_id, Friend.friends != True)
-                    .options(load_only(Friend.id),
-                             selectinload(Friend.follower_user).load_only(User.id, User.username)))
-            followers = followers.scalars().all()
-        return {'status': 202, 'data': {'followers': followers}}
+            followers = await self.paginate_users(self.query_follower_ids(self.user_id), cursor, limit)
+        return {'status': 202, 'data': {'followers': followers['users'], 'next_cursor': followers['next_cursor']}}
+
+    async def get_friend_count(self, user_id=None):
+        user_id = self.user_id if user_id is None else user_id
+        counts = await self.session.execute(
+            select(func.count().filter(Friend.friends == True),
+                   func.count().filter(and_(Friend.following_user_id == user_id, Friend.friends != True)),
+                   func.count().filter(and_(Friend.follower_user_id == user_id, Friend.friends != True)))
+                .filter(or_(Friend.follower_user_id == user_id, Friend.following_user_id == user_id))
+        )
+        friends, followers, followings = counts.one()
+        return {'status': 200, 'data': {'friends': friends, 'followers': followers, 'followings': followings}}
+
+    async def get_mutual_friends(self, user_id, cursor: str = None, limit: int = None):
+        await self.check_user(user_id)
+        mutual = intersect(self.query_friend_ids(self.user_id), self.query_friend_ids(user_id))
+        friends = await self.paginate_users(mutual, cursor, limit)
+        return {'status': 200, 'data': {'friends': friends['users'], 'next_cursor': friends['next_cursor']}}
+
+    async def get_friend_suggestions(self, limit: int = None):
+        limit = limit or settings.pagination['limit']
+        friend_ids = self.query_friend_ids(self.user_id).subquery()
+        candidates = union_all(
+            select(Friend.following_user_id.label('user_id'))
+                .filter(Friend.follower_user_id.in_(select(friend_ids)), Friend.friends == True),
+            select(Friend.follower_user_id.label('user_id'))
+                .filter(Friend.following_user_id.in_(select(friend_ids)), Friend.friends == True)
+        ).subquery()
+        mutual = func.count().label('mutual')
+        suggestions = await self.session.execute(
+            select(User.id, User.username, mutual)
+                .join(candidates, candidates.c.user_id == User.id)
+                .filter(User.id != self.user_id, User.id.not_in(self.query_related_ids(self.user_id)))
+                .group_by(User.id, User.username)
+                .order_by(mutual.desc(), User.id)
+                .limit(limit)
+        )
+        suggestions = [{'id': user.id, 'username': user.username, 'mutual': user.mutual}
+                       for user in suggestions.all()]
+        return {'status': 200, 'data': {'suggestions': suggestions}}
@@ -0,0 +1,81 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from src.models.sessions import engine
+from src.settings import settings
+
+logger = logging.getLogger(__name__)
+query_profile: ContextVar = ContextVar('query_profile', default=None)
+
+
+def before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    connection.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    query_start = connection.info.get('query_start')
+    if not query_start:  # the listeners were registered while this query was running
+        return
+    duration = time.perf_counter() - query_start.pop()
+    profile = query_profile.get()
+    if profile is not None:
+        profile['count'] += 1
+        profile['time'] += duration
+    if duration * 1000 >= settings.profiler['slow_query_ms']:
+        logger.warning('Slow query %.1f ms: %s', duration * 1000, statement)
+
+
+def register_query_events():
+    for name, listener in [('before_cursor_execute', before_cursor_execute),
+                           ('after_cursor_execute', after_cursor_execute)]:
+        if not event.contains(engine.sync_engine, name, listener):
+            event.listen(engine.sync_engine, name, listener)
+
+
+def new_profile() -> dict:
+    return {'count': 0, 'time': 0.0}
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    register_query_events()
+    profile = new_profile()
+    token = query_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        query_profile.reset(token)
+    assert profile['count'] <= limit, f"Expected at most {limit} queries, {profile['count']} were executed"
+
+
+class ProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        profile = query_profile.get()
+        token = None
+        if profile is None:
+            profile = new_profile()
+            token = query_profile.set(profile)
+
+        async def send_profile(message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = list(message.get('headers', [])) + [
+                    (b'server-timing', f"db;dur={profile['time'] * 1000:.2f};desc=\"{profile['count']} queries\""
+                     .encode()),
+                    (b'x-query-count', str(profile['count']).encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_profile)
+        finally:
+            if token is not None:
+                query_profile.reset(token)
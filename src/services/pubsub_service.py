@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import asyncpg
+
+from src.settings import settings
+
+
+class MemoryPubSub:
+    def __init__(self):
+        self.callbacks: dict = {}
+
+    async def subscribe(self, channel: str, callback):
+        self.callbacks[channel] = callback
+
+    async def unsubscribe(self, channel: str):
+        self.callbacks.pop(channel, None)
+
+    async def publish(self, channel: str, data: dict):
+        if channel in self.callbacks:
+            await self.callbacks[channel](channel, data)
+
+    async def close(self):
+        self.callbacks.clear()
+
+
+class PostgresPubSub:
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self.connection: asyncpg.Connection = None
+        self.lock = asyncio.Lock()
+        self.callbacks: dict = {}
+        self.tasks: set = set()
+
+    async def get_connection(self) -> asyncpg.Connection:
+        if self.connection is None or self.connection.is_closed():
+            self.connection = await asyncpg.connect(self.dsn)
+            self.connection.add_termination_listener(self.on_termination)
+            for channel in self.callbacks:
+                await self.connection.add_listener(channel, self.listener)
+        return self.connection
+
+    def spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def listener(self, connection, pid, channel: str, payload: str):
+        if channel in self.callbacks:
+            self.spawn(self.callbacks[channel](channel, json.loads(payload)))
+
+    def on_termination(self, connection):
+        # close() detaches the connection first, so only an unexpected drop gets here.
+        if connection is self.connection and self.callbacks:
+            self.spawn(self.reconnect())
+
+    async def reconnect(self):
+        while self.callbacks:
+            try:
+                async with self.lock:
+                    await self.get_connection()
+                return
+            except Exception as errData:
+                print('PostgresPubSub.reconnect -> ', errData)
+                await asyncio.sleep(settings.chat['pubsub_reconnect_interval'])
+
+    async def subscribe(self, channel: str, callback):
+        async with self.lock:
+            self.callbacks[channel] = callback
+            connection = await self.get_connection()
+            await connection.add_listener(channel, self.listener)
+
+    async def unsubscribe(self, channel: str):
+        async with self.lock:
+            if self.callbacks.pop(channel, None) is not None and self.connection is not None:
+                await self.connection.remove_listener(channel, self.listener)
+
+    async def publish(self, channel: str, data: dict):
+        async with self.lock:
+            connection = await self.get_connection()
+            await connection.execute('SELECT pg_notify($1, $2)', channel, json.dumps(data, default=str))
+
+    async def close(self):
+        if self.connection is not None:
+            connection, self.connection = self.connection, None
+            await connection.close()
+        for task in list(self.tasks):
+            task.cancel()
+
+
+def get_pubsub():
+    if settings.chat['pubsub'] == 'postgres':
+        return PostgresPubSub(settings.database['DATABASE_URL'].replace('postgresql+asyncpg://', 'postgresql://'))
+    return MemoryPubSub()
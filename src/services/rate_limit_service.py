@@ -0,0 +1,97 @@
+import math
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request
+from sqlalchemy import text
+
+from src.models.sessions import engine
+from src.services.user_service import UserService
+from src.settings import settings
+
+
+class MemoryRateLimitBackend:
+    def __init__(self):
+        self.buckets: OrderedDict = OrderedDict()
+
+    async def take(self, key: str, capacity: float, refill: float) -> float:
+        now = time.monotonic()
+        tokens, updated = self.buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill)
+        allowed = tokens >= 1
+        self.buckets[key] = (tokens - 1 if allowed else tokens, now)
+        self.buckets.move_to_end(key)
+        while len(self.buckets) > settings.rate_limits['memory_max_keys']:
+            self.buckets.popitem(last=False)
+        return 0 if allowed else (1 - tokens) / refill
+
+
+class PostgresRateLimitBackend:
+    refilled = ('LEAST(CAST(:capacity AS float8), rate_limit.tokens + '
+                'CAST(EXTRACT(EPOCH FROM (now() - rate_limit.updated)) AS float8) * CAST(:refill AS float8))')
+    query = text(f'''
+        INSERT INTO rate_limit (key, tokens, allowed, updated)
+        VALUES (:key, CAST(:capacity AS float8) - 1, TRUE, now())
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = CASE WHEN {refilled} >= 1 THEN {refilled} - 1 ELSE {refilled} END,
+            allowed = {refilled} >= 1,
+            updated = now()
+        RETURNING tokens, allowed
+    ''')
+    cleanup_query = text('DELETE FROM rate_limit WHERE updated < now() - make_interval(secs => CAST(:age AS float8))')
+
+    def __init__(self):
+        self.cleaned = time.monotonic()
+
+    @classmethod
+    def stale_after(cls) -> float:
+        # A bucket untouched for capacity / refill seconds is full again, the same as having no row at all.
+        return max(limit['capacity'] / limit['refill_per_second'] for limit in settings.rate_limits['routes'].values())
+
+    async def cleanup(self):
+        self.cleaned = time.monotonic()
+        async with engine.begin() as connection:
+            await connection.execute(self.cleanup_query, {'age': self.stale_after()})
+
+    async def take(self, key: str, capacity: float, refill: float) -> float:
+        async with engine.begin() as connection:
+            bucket = await connection.execute(self.query, {'key': key, 'capacity': capacity, 'refill': refill})
+            bucket = bucket.one()
+        if time.monotonic() - self.cleaned > settings.rate_limits['cleanup_interval']:
+            await self.cleanup()
+        return 0 if bucket.allowed else (1 - bucket.tokens) / refill
+
+
+def get_rate_limit_backend():
+    if settings.rate_limits['backend'] == 'postgres':
+        return PostgresRateLimitBackend()
+    return MemoryRateLimitBackend()
+
+
+rate_limit_backend = get_rate_limit_backend()
+
+
+class RateLimiter:
+    def __init__(self, route: str):
+        self.route = route
+
+    @classmethod
+    def get_key(cls, request: Request) -> str:
+        authorization = request.headers.get('authorization', '')
+        if authorization.lower().startswith('bearer '):
+            try:
+                return f"user:{UserService.check_jwt_token(authorization[7:])['sub']}"
+            except HTTPException:
+                pass
+        return f"ip:{request.client.host if request.client else 'unknown'}"
+
+    async def __call__(self, request: Request):
+        if not settings.rate_limits['enabled']:
+            return
+        limit = settings.rate_limits['routes'][self.route]
+        retry_after = await rate_limit_backend.take(f'{self.route}:{self.get_key(request)}',
+                                                    limit['capacity'], limit['refill_per_second'])
+        if retry_after > 0:
+            raise HTTPException(status_code=429,
+                                detail={'status': 429, 'data': {'errors': ['Too many requests']}},
+                                headers={'Retry-After': str(math.ceil(retry_after))})
@@ -0,0 +1,50 @@
+import asyncio
+import os
+import tempfile
+
+from fastapi.staticfiles import StaticFiles
+
+from src.settings import settings
+
+
+class LocalMediaStorage:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path(self, key: str) -> str:
+        return f'{self.directory}/{key}'
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(os.path.exists, self.path(key))
+
+    async def save(self, key: str, data: bytes):
+        await asyncio.to_thread(self.write, self.path(key), data)
+
+    @classmethod
+    def write(cls, path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(data)
+            os.chmod(temporary_path, 0o644)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+
+class ImmutableStaticFiles(StaticFiles):
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers['Cache-Control'] = settings.media['cache_control']
+        return response
+
+
+def get_storage():
+    if settings.media['storage'] == 'local':
+        return LocalMediaStorage(settings.media['directory'])
+    raise ValueError(f"Unknown media storage: {settings.media['storage']}")
+
+
+storage = get_storage()
@@ -1,3 +1,5 @@
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Annotated
 from typing import AsyncGenerator
@@ -9,28 +11,96 @@ from jose import jwt, JWTError
 from passlib.hash import bcrypt
 from sqlalchemy import insert, select
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import load_only
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models.sessions import async_session
+from src.models.sessions import get_async_session
 from src.models.tables import User
 from src.schemas.user_schema import CreateUserSchema, TokenUserSchema, JWTToken, JWTTokenPayload
+from src.services.executor_service import ExecutorService
 from src.settings import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/user/sign-in/')
 
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> TokenUserSchema:
-    return await UserService.get_jwt_user(token)
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)],
+                           session: AsyncSession = Depends(get_async_session)) -> TokenUserSchema:
+    return await UserService.get_jwt_user(token, session)
+
+
+def hash_password(password: str) -> str:
+    return bcrypt.hash(password)
+
+
+def verify_password(plain_password: str, hash_password: str) -> bool:
+    return bcrypt.verify(plain_password, hash_password)
+
+
+class PasswordExecutorService(ExecutorService):
+    executor = None
+    semaphore = None
+    stats = {'queued': 0, 'running': 0}
+
+    @classmethod
+    def get_config(cls) -> dict:
+        return {'executor': settings.security['password_executor'],
+                'workers': settings.security['password_workers'],
+                'concurrency': settings.security['password_concurrency']}
+
+
+class AuthCacheService:
+    tokens: OrderedDict = OrderedDict()
+    users: OrderedDict = OrderedDict()
+    stats: dict = {'hits': 0, 'misses': 0}
+
+    @classmethod
+    def get(cls, storage: OrderedDict, key):
+        entry = storage.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires <= time.time():
+            storage.pop(key, None)
+            return None
+        storage.move_to_end(key)
+        return value
+
+    @classmethod
+    def set(cls, storage: OrderedDict, key, value, expires: float):
+        storage[key] = (value, expires)
+        storage.move_to_end(key)
+        while len(storage) > settings.security['auth_cache_size']:
+            storage.popitem(last=False)
+
+    @classmethod
+    def get_user(cls, token: str):
+        user_id = cls.get(cls.tokens, token)
+        user = cls.get(cls.users, user_id) if user_id is not None else None
+        cls.stats['hits' if user is not None else 'misses'] += 1
+        return user
+
+    @classmethod
+    def set_user(cls, token: str, payload: JWTTokenPayload, user: TokenUserSchema):
+        expires = min(float(payload['exp']), time.time() + settings.security['auth_cache_ttl'])
+        cls.set(cls.tokens, token, user['id'], expires)
+        cls.set(cls.users, user['id'], user, time.time() + settings.security['auth_cache_ttl'])
+
+    @classmethod
+    def invalidate_user(cls, user_id: int):
+        cls.users.pop(user_id, None)
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        return {**cls.stats, 'tokens': len(cls.tokens), 'users': len(cls.users)}
 
 
 class UserService:
     @classmethod
-    def create_hash_password(cls, password: str) -> str:
-        return bcrypt.hash(password)
+    async def create_hash_password(cls, password: str) -> str:
+        return await PasswordExecutorService.run(hash_password, password)
 
     @classmethod
-    def check_password(cls, plain_password: str, hash_password: str) -> bool:
-        return bcrypt.verify(plain_password, hash_password)
+    async def check_password(cls, plain_password: str, hash_password: str) -> bool:
+        return await PasswordExecutorService.run(verify_password, plain_password, hash_password)
 
     @classmethod
     def create_jwt_token(cls, user) -> JWTToken:
@@ -58,20 +128,22 @@ class UserService:
         return payload
 
     @classmethod
-    async def get_jwt_user(cls, token: str) -> TokenUserSchema:
+    async def get_jwt_user(cls, token: str, session: AsyncSession) -> TokenUserSchema:
+        user = AuthCacheService.get_user(token)
+        if user is not None:
+            return user
         payload = cls.check_jwt_token(token)
-        async with async_session() as session:
-            user_id = int(payload['sub'])
-            user = await session.execute(
-                select(User).options(
-                    load_only(User.id, User.username, User.email, User.first_name, User.last_name, User.active)
-                ).filter(User.id == user_id))
-            user_db = user.scalars().one()
-        return {'id': user_db.id, 'email': user_db.email, 'username': user_db.username}
+        user_id = int(payload['sub'])
+        user = await session.execute(
+            select(User.id, User.username, User.email).filter(User.id == user_id))
+        user_db = user.one()
+        user = {'id': user_db.id, 'email': user_db.email, 'username': user_db.username}
+        AuthCacheService.set_user(token, payload, user)
+        return user
 
     async def create_user(self, session: AsyncGenerator, data_user: CreateUserSchema):
         data_user = data_user.dict()
-        data_user['password'] = self.create_hash_password(data_user['password'])
+        data_user['password'] = await self.create_hash_password(data_user['password'])
         try:
             await session.execute(insert(User).values(**data_user))
         except IntegrityError as errorData:
@@ -93,7 +165,7 @@ class UserService:
             raise HTTPException(status_code=400, detail=exception_detail)
         except Exception as errorData:
             print('-->', errorData)
-        if not self.check_password(data_user.password, user_db.password):
+        if not await self.check_password(data_user.password, user_db.password):
             raise HTTPException(status_code=400, detail=exception_detail)
 
         return self.create_jwt_token(user_db)
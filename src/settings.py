@@ -1,7 +1,8 @@
 from pydantic import BaseSettings
 from fastapi.templating import Jinja2Templates
 
-from src.environment import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME, JWT_USER_SECRET
+from src.environment import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME, JWT_USER_SECRET, DB_POOL_SIZE, \
+    DB_POOL_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_PREPARED_STATEMENT_CACHE_SIZE
 
 
 class Settings(BaseSettings):
@@ -11,13 +12,83 @@ class Settings(BaseSettings):
         'DB_USER': DB_USER,
         'DB_PASSWORD': DB_PASSWORD,
         'DB_NAME': DB_NAME,
-        'DATABASE_URL': f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+        'DATABASE_URL': f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}",
+        'POOL_SIZE': DB_POOL_SIZE,
+        'POOL_MAX_OVERFLOW': DB_POOL_MAX_OVERFLOW,
+        'POOL_TIMEOUT': DB_POOL_TIMEOUT,
+        'POOL_RECYCLE': DB_POOL_RECYCLE,
+        'POOL_PRE_PING': DB_POOL_PRE_PING,
+        'PREPARED_STATEMENT_CACHE_SIZE': DB_PREPARED_STATEMENT_CACHE_SIZE
     }
     security: dict = {
         'jwt_secret': JWT_USER_SECRET,
         'jwt_type': 'bearer',
         'jwt_lifetime': 3600,
-        'jwt_algorithm': 'HS256'
+        'jwt_algorithm': 'HS256',
+        'auth_cache_size': 10000,
+        'auth_cache_ttl': 300,
+        'password_executor': 'thread',
+        'password_workers': 4,
+        'password_concurrency': 8
+    }
+    pagination: dict = {
+        'limit': 20,
+        'max_limit': 100
+    }
+    feed: dict = {
+        'fanout_limit': 5000
+    }
+    images: dict = {
+        'executor': 'process',
+        'workers': 2,
+        'concurrency': 4,
+        'chunk_size': 64 * 1024,
+        'max_bytes': 10 * 1024 * 1024,
+        'max_dimension': 10000,
+        'max_pixels': 40000000,
+        'webp': True,
+        'variants': {
+            'user_posts': {'thumbnail': (400, 400), 'full': (1200, 1200)},
+            'user_profiles': {'small': (100, 100), 'large': (300, 700)}
+        },
+        'primary': {
+            'user_posts': 'thumbnail',
+            'user_profiles': 'large'
+        }
+    }
+    media: dict = {
+        'storage': 'local',
+        'directory': 'static/media',
+        'cache_control': 'public, max-age=31536000, immutable'
+    }
+    chat: dict = {
+        'pubsub': 'memory',
+        'pubsub_reconnect_interval': 1,
+        'send_queue_size': 100,
+        'overflow_policy': 'drop_oldest',
+        'write_behind': False,
+        'write_batch_size': 200,
+        'write_interval': 0.05
+    }
+    metrics: dict = {
+        'buckets': [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+    }
+    profiler: dict = {
+        'enabled': False,
+        'slow_query_ms': 100
+    }
+    rate_limits: dict = {
+        'enabled': True,
+        'backend': 'memory',
+        'memory_max_keys': 100000,
+        'cleanup_interval': 600,
+        'routes': {
+            'sign-in': {'capacity': 10, 'refill_per_second': 10 / 60},
+            'sign-up': {'capacity': 5, 'refill_per_second': 5 / 3600},
+            'create-post': {'capacity': 10, 'refill_per_second': 10 / 60},
+            'profile-update': {'capacity': 5, 'refill_per_second': 5 / 60},
+            'chat-send': {'capacity': 30, 'refill_per_second': 1}
+        }
     }
     messages: dict = {
         'validation': {
@@ -0,0 +1,39 @@
+"""Point the app at TEST_DATABASE_URL before src is imported.
+
+The app builds its URL from the DB_* variables (host and port together in DB_HOST), so the asyncpg DSN
+is split into them here. The app runs in a temporary directory with its own static/ for uploads, and rate
+limits are switched off: every test request comes from the same client.
+"""
+import asyncio
+import os
+from urllib.parse import urlparse
+
+import pytest
+
+DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+
+if DATABASE_URL:
+    url = urlparse(DATABASE_URL)
+    os.environ.update({'DB_HOST': f'{url.hostname}:{url.port or 5432}',
+                       'DB_PORT': str(url.port or 5432),
+                       'DB_USER': url.username or '',
+                       'DB_PASSWORD': url.password or '',
+                       'DB_NAME': url.path.lstrip('/')})
+    os.environ.setdefault('JWT_USER_SECRET', 'test-secret')
+    os.environ.setdefault('DB_POOL_TIMEOUT', '10')
+
+
+@pytest.fixture(scope='session')
+def run(tmp_path_factory):
+    from src.models.sessions import engine
+    from src.settings import settings
+
+    settings.rate_limits['enabled'] = False
+    directory = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('app'))
+    os.makedirs('static')
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.run_until_complete(engine.dispose())
+    loop.close()
+    os.chdir(directory)
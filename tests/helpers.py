@@ -0,0 +1,34 @@
+import uuid
+
+import httpx
+import pytest
+
+from tests.conftest import DATABASE_URL
+
+PASSWORD = 'Test-password-1'
+
+requires_database = pytest.mark.skipif(not DATABASE_URL, reason='TEST_DATABASE_URL is not set')
+
+
+def app_client() -> httpx.AsyncClient:
+    from src.main import app
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test')
+
+
+async def sign_up(client: httpx.AsyncClient) -> dict:
+    username = f'test_{uuid.uuid4().hex[:12]}'
+    response = await client.post('/user/sign-up', json={'email': f'{username}@example.com', 'username': username,
+                                                        'password': PASSWORD, 'first_name': username,
+                                                        'last_name': username})
+    response.raise_for_status()
+    response = await client.post('/user/sign-in', data={'username': username, 'password': PASSWORD})
+    response.raise_for_status()
+    headers = {'Authorization': f"Bearer {response.json()['access_token']}"}
+    profile = await client.get('/profile/self', headers=headers)
+    return {'id': profile.json()['data']['profile']['user_id'], 'username': username, 'headers': headers}
+
+
+async def befriend(client: httpx.AsyncClient, first: dict, second: dict):
+    await client.post('/profile/friend/addition-deletion', params={'user_id': second['id']}, headers=first['headers'])
+    await client.post('/profile/friend/addition-deletion', params={'user_id': first['id']}, headers=second['headers'])
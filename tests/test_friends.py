@@ -0,0 +1,55 @@
+import asyncio
+
+from tests.helpers import requires_database, app_client, sign_up, befriend
+
+pytestmark = requires_database
+
+
+async def build_graph(client) -> dict:
+    """me and other share friends first and second; third is only my friend.
+
+    follower follows me without being accepted, and I follow followed.
+    """
+    users = dict(zip(['me', 'other', 'first', 'second', 'third', 'follower', 'followed'],
+                     await asyncio.gather(*[sign_up(client) for _ in range(7)])))
+    for name in ['first', 'second', 'third']:
+        await befriend(client, users['me'], users[name])
+    for name in ['first', 'second']:
+        await befriend(client, users['other'], users[name])
+    await client.post('/profile/friend/addition-deletion', params={'user_id': users['me']['id']},
+                      headers=users['follower']['headers'])
+    await client.post('/profile/friend/addition-deletion', params={'user_id': users['followed']['id']},
+                      headers=users['me']['headers'])
+    return users
+
+
+def test_mutual_friends_counts_and_suggestions(run):
+    async def scenario():
+        async with app_client() as client:
+            users = await build_graph(client)
+            me = users['me']
+
+            mutual = await client.get(f"/profile/friend/mutual/{users['other']['id']}", headers=me['headers'])
+            assert mutual.status_code == 200
+            assert [user['id'] for user in mutual.json()['data']['friends']] == \
+                   sorted([users['first']['id'], users['second']['id']])
+
+            page = await client.get(f"/profile/friend/mutual/{users['other']['id']}", params={'limit': 1},
+                                    headers=me['headers'])
+            rest = await client.get(f"/profile/friend/mutual/{users['other']['id']}",
+                                    params={'limit': 1, 'cursor': page.json()['data']['next_cursor']},
+                                    headers=me['headers'])
+            assert [user['id'] for user in page.json()['data']['friends'] + rest.json()['data']['friends']] == \
+                   sorted([users['first']['id'], users['second']['id']])
+
+            count = await client.get('/profile/friend/count', headers=me['headers'])
+            assert count.json()['data'] == {'friends': 3, 'followers': 1, 'followings': 1}
+            count = await client.get('/profile/friend/count', params={'user_id': users['other']['id']},
+                                     headers=me['headers'])
+            assert count.json()['data'] == {'friends': 2, 'followers': 0, 'followings': 0}
+
+            suggestions = await client.get('/profile/friend/suggestions', headers=me['headers'])
+            assert suggestions.json()['data']['suggestions'] == \
+                   [{'id': users['other']['id'], 'username': users['other']['username'], 'mutual': 2}]
+
+    run(scenario())
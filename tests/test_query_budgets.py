@@ -0,0 +1,66 @@
+"""Per-endpoint SQL query budgets, counted by assert_max_queries.
+
+Every listing is requested with ROWS rows on the page, so an N+1 regression pushes it over its budget.
+/page/posts spends its three on the ETag, the page and the authors; /chat/get on the companion, the chat
+and the page.
+"""
+import asyncio
+
+import pytest
+
+from tests.helpers import requires_database, app_client, sign_up, befriend
+
+pytestmark = requires_database
+
+ROWS = 5
+BUDGETS = {
+    'page-posts': ('/page/posts', 3, lambda body: body['data']['posts']),
+    'profile-all': ('/profile/all', 1, lambda body: body['data']['profiles']),
+    'profile-friends': ('/profile/friends/friends', 1, lambda body: body['data']['friends']),
+    'profile-followers': ('/profile/friends/followers', 1, lambda body: body['data']['followers']),
+    'profile-followings': ('/profile/friends/followings', 1, lambda body: body['data']['followers']),
+    'chat-get': ('/chat/get/{companion}', 3, lambda body: next(iter(body['messages'].values()))),
+}
+
+
+@pytest.fixture(scope='module')
+def context(run) -> dict:
+    async def build():
+        async with app_client() as client:
+            me, *friends = await asyncio.gather(*[sign_up(client) for _ in range(ROWS + 1)])
+            for friend in friends:
+                await befriend(client, me, friend)
+                await client.post('/page/create-post', data={'text': 'budget post'}, headers=friend['headers'])
+            followers = await asyncio.gather(*[sign_up(client) for _ in range(ROWS)])
+            followings = await asyncio.gather(*[sign_up(client) for _ in range(ROWS)])
+            for follower in followers:
+                await client.post('/profile/friend/addition-deletion', params={'user_id': me['id']},
+                                  headers=follower['headers'])
+            for following in followings:
+                await client.post('/profile/friend/addition-deletion', params={'user_id': following['id']},
+                                  headers=me['headers'])
+            for number in range(ROWS):
+                await client.post('/chat/send', params={'user_id': friends[0]['id'], 'message': f'budget {number}'},
+                                  headers=me['headers'])
+            # Warm the auth cache so the budgets count the endpoint, not the first token lookup.
+            await client.get('/profile/self', headers=me['headers'])
+            return {'me': me, 'companion': friends[0]['username']}
+
+    return run(build())
+
+
+@pytest.mark.parametrize('name', BUDGETS)
+def test_query_budget(name, run, context):
+    from src.services.profiler_service import assert_max_queries
+
+    path, budget, rows = BUDGETS[name]
+
+    async def request():
+        async with app_client() as client:
+            with assert_max_queries(budget):
+                response = await client.get(path.format(companion=context['companion']),
+                                            params={'limit': ROWS}, headers=context['me']['headers'])
+            assert response.status_code == 200
+            return response.json()
+
+    assert len(rows(run(request()))) == ROWS
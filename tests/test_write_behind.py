@@ -0,0 +1,39 @@
+import asyncio
+
+from sqlalchemy import select, func
+
+from tests.helpers import requires_database, app_client, sign_up
+
+pytestmark = requires_database
+
+
+def test_more_concurrent_sends_than_pool_connections(run):
+    from src.models.sessions import engine, async_session
+    from src.models.tables import Messages
+    from src.settings import settings
+
+    async def scenario():
+        async with app_client() as client:
+            sender, recipient = await sign_up(client), await sign_up(client)
+            first = await client.post('/chat/send', params={'user_id': recipient['id'], 'message': 'first'},
+                                      headers=sender['headers'])
+            assert first.status_code == 200
+
+            count = engine.pool.size() + engine.pool._max_overflow + 5
+            settings.chat['write_behind'] = True
+            try:
+                responses = await asyncio.gather(*[
+                    client.post('/chat/send', params={'user_id': recipient['id'], 'message': f'message {number}'},
+                                headers=sender['headers'])
+                    for number in range(count)
+                ])
+            finally:
+                settings.chat['write_behind'] = False
+            assert [response.status_code for response in responses] == [200] * count
+
+            async with async_session() as session:
+                stored = await session.execute(select(func.count()).select_from(Messages)
+                                               .filter(Messages.sender_id == sender['id']))
+                assert stored.scalar_one() == count + 1
+
+    run(scenario())